@@ -1,161 +1,66 @@
 import tkinter as tk
-from tkinter import messagebox, ttk, filedialog
-import random
-import pandas as pd
+from tkinter import messagebox, ttk, filedialog, simpledialog
 from datetime import datetime
+from array import array
 import os
+import math
+import random
+import threading
+import time
 
-# ================== Subject-specific percentage weights ==================
-subject_weights = {
-    "Math": {"Written": 40, "Performance": 40, "Assessment": 20},
-    "English": {"Written": 30, "Performance": 50, "Assessment": 20},
-    "Science": {"Written": 35, "Performance": 45, "Assessment": 20},
-    "Filipino": {"Written": 25, "Performance": 50, "Assessment": 25},
-    "Araling Panlipunan": {"Written": 30, "Performance": 50, "Assessment": 20},
-}
-
-# ================== Grade Logic ==================
-def calculate_component_grade(scores, perfect_scores):
-    return (sum(scores) / sum(perfect_scores)) * 100 if sum(perfect_scores) > 0 else 0
-
-def find_combination(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, target_grade, tolerance=0.01, max_attempts=100000):
-    for _ in range(max_attempts):
-        w_scores = [random.randint(0, p) for p in w_perfect]
-        p_scores = [random.randint(0, p) for p in p_perfect]
-        a_scores = [random.randint(0, p) for p in a_perfect]
-
-        w_grade = calculate_component_grade(w_scores, w_perfect)
-        p_grade = calculate_component_grade(p_scores, p_perfect)
-        a_grade = calculate_component_grade(a_scores, a_perfect)
-
-        final = (w_grade * w_weight + p_grade * p_weight + a_grade * a_weight) / 100
-
-        if abs(final - target_grade) <= tolerance:
-            return {
-                "Written Works": (w_scores, w_grade),
-                "Performance Task": (p_scores, p_grade),
-                "Quarterly Assessment": (a_scores, a_grade),
-                "Final Grade": round(final, 2)
-            }
-    return None
+from grading import (
+    subject_weights, solve_class, solve_class_parallel,
+    AchievableGradeIndex, SolutionCache, SOLUTION_CACHE_PATH, read_roster,
+    write_excel_file, write_excel_workbook, warm_heavy_imports,
+    solver_telemetry, solver_summary, write_diagnostics_json, reuse_results, ResultStore,
+    target_window, transmute, TRANSMUTATION_TABLE, save_session, load_session, SESSION_PATH, grade_class_record
+)
 
-def create_excel_file(results, subject, w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight):
-    """Create an Excel file with the grades in the specified format"""
+# ================== Excel Export Dialogs ==================
+def _save_with_dialog(write, extension=".xlsx", kind="Excel"):
+    """Ask for a file name, run write(filename) and report the outcome in a message box"""
     try:
         filename = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
-            title="Save Excel File"
+            defaultextension=extension,
+            filetypes=[(f"{kind} files", f"*{extension}"), ("All files", "*.*")],
+            title=f"Save {kind} File"
         )
         
         if not filename:
             return False
-            
-        # Create the Excel data structure
-        data = []
-        
-        # Header row 1 - Component names and weights
-        header1 = [''] + [f'WRITTEN WORKS ({w_weight}%)'] + [''] * (len(w_perfect) + 1) + \
-                 [f'PERFORMANCE TASKS ({p_weight}%)'] + [''] * (len(p_perfect) + 1) + \
-                 [f'QUARTERLY ASSESSMENT ({a_weight}%)', '', 'Initial']
-        
-        # Header row 2 - Activity numbers and totals
-        header2 = [''] + [str(i+1) for i in range(len(w_perfect))] + ['Total', 'PS', 'WS'] + \
-                 [str(i+1) for i in range(len(p_perfect))] + ['Total', 'PS', 'WS'] + \
-                 ['1', 'PS', 'WS', 'Grade']
-        
-        # Perfect scores row
-        perfect_row = [''] + w_perfect + [sum(w_perfect), 100.00, f'{w_weight}%'] + \
-                     p_perfect + [sum(p_perfect), 100.00, f'{p_weight}%'] + \
-                     [sum(a_perfect), 100.00, f'{a_weight}%', '']
-        
-        # Add headers and perfect scores
-        data.append(header1)
-        data.append(header2)
-        data.append(perfect_row)
-        
-        # Add student data
-        for i, result in enumerate(results, 1):
-            if "Error" not in result:
-                # Written Works data
-                w_scores = result["Written Works"][0]
-                w_grade = result["Written Works"][1]
-                w_total = sum(w_scores)
-                
-                # Performance Tasks data
-                p_scores = result["Performance Task"][0]
-                p_grade = result["Performance Task"][1]
-                p_total = sum(p_scores)
-                
-                # Assessment data
-                a_scores = result["Quarterly Assessment"][0]
-                a_grade = result["Quarterly Assessment"][1]
-                a_total = sum(a_scores)
-                
-                # Final grade
-                final_grade = result["Final Grade"]
-                
-                # Create student row
-                student_row = [str(i)] + w_scores + [w_total, f'{w_grade:.2f}', f'{(w_grade * w_weight / 100):.2f}'] + \
-                             p_scores + [p_total, f'{p_grade:.2f}', f'{(p_grade * p_weight / 100):.2f}'] + \
-                             a_scores + [f'{a_grade:.2f}', f'{(a_grade * a_weight / 100):.2f}', f'{final_grade:.2f}']
-                
-                data.append(student_row)
-            else:
-                # Handle error case
-                error_row = [str(i)] + ['ERROR'] * (len(header2) - 1)
-                data.append(error_row)
         
-        # Create DataFrame
-        df = pd.DataFrame(data)
+        write(filename)
         
-        # Save to Excel with formatting
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=f'{subject} Grades', index=False, header=False)
-            
-            # Get the workbook and worksheet
-            workbook = writer.book
-            worksheet = writer.sheets[f'{subject} Grades']
-            
-            # Apply some basic formatting
-            from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-            
-            # Header formatting
-            header_font = Font(bold=True, size=10)
-            header_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-            center_align = Alignment(horizontal="center", vertical="center")
-            
-            # Apply formatting to headers
-            for row in range(1, 4):  # First 3 rows are headers
-                for col in range(1, df.shape[1] + 1):
-                    cell = worksheet.cell(row=row, column=col)
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = center_align
-            
-            # Auto-adjust column widths
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 15)  # Max width of 15
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        messagebox.showinfo("Success", f"Excel file created successfully at:\n{filename}")
+        messagebox.showinfo("Success", f"{kind} file created successfully at:\n{filename}")
         return True
         
     except ImportError:
-        messagebox.showerror("Error", "Required libraries not found. Please install:\npip install pandas openpyxl")
+        messagebox.showerror("Error", "Required libraries not found. Please install:\npip install openpyxl")
         return False
     except Exception as e:
-        messagebox.showerror("Error", f"Failed to create Excel file:\n{str(e)}")
+        messagebox.showerror("Error", f"Failed to create {kind} file:\n{str(e)}")
         return False
 
+def create_excel_file(results, subject, w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight):
+    """Create an Excel file with the grades in the specified format"""
+    return _save_with_dialog(lambda filename: write_excel_file(
+        filename, results, subject, w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight
+    ))
+
+def create_excel_workbook(sheets):
+    """Create one Excel file holding a sheet per (section, subject)"""
+    return _save_with_dialog(lambda filename: write_excel_workbook(filename, sheets))
+
+def create_diagnostics_file(results):
+    """Save the solver telemetry of results as a JSON file"""
+    return _save_with_dialog(lambda filename: write_diagnostics_json(filename, results), ".json", "JSON")
+
+def create_session_file(session):
+    """Save a session snapshot wherever the user picks"""
+    return _save_with_dialog(lambda filename: save_session(filename, session), SESSION_EXTENSION, "Session")
+
+SESSION_EXTENSION = ".gradesession"
+
 # ================== Modern GUI Styling ==================
 class ModernStyle:
     # Color scheme
@@ -223,15 +128,270 @@ def create_modern_entry(parent, width=20):
     )
     return entry
 
+class VirtualTargetGrid:
+    """Scrollable grid of target entries that only builds widgets for the rows on screen.
+
+    The values live in a plain list owned by the caller; scrolling re-binds the same
+    few cells to other students instead of creating more widgets.
+    """
+    VISIBLE_ROWS = 10
+    
+    def __init__(self, parent, values, columns, on_edit, is_flagged):
+        self.values = values
+        self.columns = columns
+        self.on_edit = on_edit
+        self.is_flagged = is_flagged
+        self.offset = 0  # first visible row
+        self.total_rows = (len(values) + columns - 1) // columns
+        self.visible_rows = min(self.VISIBLE_ROWS, self.total_rows)
+        
+        frame = tk.Frame(parent, bg=ModernStyle.SURFACE)
+        frame.pack(fill="both", expand=True)
+        cells_frame = tk.Frame(frame, bg=ModernStyle.SURFACE)
+        cells_frame.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.on_scroll)
+        if self.total_rows > self.visible_rows:
+            self.scrollbar.pack(side="right", fill="y")
+        
+        self.cells = []
+        for row in range(self.visible_rows):
+            for col in range(columns):
+                cell_frame = tk.Frame(cells_frame, bg=ModernStyle.SURFACE)
+                cell_frame.grid(row=row, column=col, sticky="w", padx=(0, 10), pady=2)
+                
+                # Horizontal layout for each student
+                label = tk.Label(
+                    cell_frame,
+                    font=ModernStyle.FONT_MEDIUM,
+                    bg=ModernStyle.SURFACE,
+                    fg=ModernStyle.TEXT_PRIMARY,
+                    width=12,
+                    anchor="w"
+                )
+                label.pack(side="left")
+                
+                entry = create_modern_entry(cell_frame, width=10)
+                entry.pack(side="left", padx=(5, 0))
+                slot = len(self.cells)
+                entry.bind("<KeyRelease>", lambda e, slot=slot: self.store(slot))
+                entry.bind("<FocusOut>", lambda e, slot=slot: self.store(slot))
+                
+                percent_label = tk.Label(
+                    cell_frame,
+                    text="%",
+                    font=ModernStyle.FONT_MEDIUM,
+                    bg=ModernStyle.SURFACE,
+                    fg=ModernStyle.TEXT_SECONDARY
+                )
+                percent_label.pack(side="left", padx=(2, 0))
+                
+                for widget in (cell_frame, label, entry, percent_label):
+                    widget.bind("<MouseWheel>", self.on_wheel)
+                    widget.bind("<Button-4>", self.on_wheel)
+                    widget.bind("<Button-5>", self.on_wheel)
+                self.cells.append((cell_frame, label, entry))
+        
+        self.render()
+    
+    def index_of(self, slot):
+        return (self.offset + slot // self.columns) * self.columns + slot % self.columns
+    
+    def render(self):
+        """Point every cell at the student it currently shows"""
+        for slot, (cell_frame, label, entry) in enumerate(self.cells):
+            index = self.index_of(slot)
+            if index >= len(self.values):
+                cell_frame.grid_remove()
+                continue
+            cell_frame.grid()
+            label.config(text=f"Student {index+1}:")
+            entry.delete(0, tk.END)
+            entry.insert(0, self.values[index])
+        self.refresh_flags()
+        if self.total_rows:
+            self.scrollbar.set(self.offset / self.total_rows, (self.offset + self.visible_rows) / self.total_rows)
+    
+    def refresh_flags(self):
+        """Outline the visible entries whose targets are flagged"""
+        for slot, (_, _, entry) in enumerate(self.cells):
+            index = self.index_of(slot)
+            if index < len(self.values):
+                entry.config(highlightbackground=ModernStyle.ERROR if self.is_flagged(index) else ModernStyle.BORDER)
+    
+    def store(self, slot):
+        """Copy an edited entry back into the value list"""
+        index = self.index_of(slot)
+        value = self.cells[slot][2].get()
+        if index < len(self.values) and value != self.values[index]:
+            self.values[index] = value
+            self.on_edit(index)
+    
+    def scroll_to(self, row):
+        row = max(0, min(row, self.total_rows - self.visible_rows))
+        if row != self.offset:
+            self.offset = row
+            self.render()
+    
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * self.total_rows))
+        elif unit == "pages":
+            self.scroll_to(self.offset + int(amount) * self.visible_rows)
+        else:
+            self.scroll_to(self.offset + int(amount))
+    
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 1)
+        else:
+            self.scroll_to(self.offset + 1)
+        return "break"
+
+class ResultsTable:
+    """One Treeview row per student of a ResultStore; the per-activity scores are only built when a row is opened"""
+    COMPONENTS = ("Written Works", "Performance Task", "Quarterly Assessment")
+    COLUMNS = ("written", "performance", "assessment", "final", "transmuted", "details")
+    HEADINGS = ("Written %", "Performance %", "Assessment %", "Initial", "Transmuted", "Details")
+    FILTERS = ("All", "Solved", "Approximate", "Errors")
+    
+    def __init__(self, parent, results):
+        self.results = results
+        self.sort_column = None
+        self.sort_reverse = False
+        self.current_filter = "All"
+        
+        self.tree = ttk.Treeview(parent, columns=self.COLUMNS, selectmode="browse")
+        self.tree.heading("#0", text="Student", command=lambda: self.sort_by("#0"))
+        self.tree.column("#0", width=170, stretch=False)
+        for column, heading in zip(self.COLUMNS, self.HEADINGS):
+            self.tree.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=95, anchor="center", stretch=False)
+        self.tree.column("details", width=300, anchor="w", stretch=True)
+        self.tree.tag_configure("error", foreground=ModernStyle.ERROR)
+        self.tree.tag_configure("approximate", foreground=ModernStyle.WARNING)
+        
+        scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        
+        # Item ids are the roster positions, so every row maps straight back to its result
+        for i in range(len(results)):
+            label = f"{i+1}  {results.names[i]}" if i in results.names else f"Student {i+1}"
+            if results.failed[i]:
+                note = self.miss_note(results.telemetry(i))
+                values = ("", "", "", f"{results.final[i]}", "", f"❌ {results.errors[i]}{note}")
+                self.tree.insert("", "end", iid=str(i), text=label, values=values, tags=("error",))
+            else:
+                grades = [f"{grade:.2f}" for grade in results.component_grades(i)]
+                final = results.final[i]
+                miss = results.miss[i]
+                if math.isnan(miss):
+                    details, tags = "✅ Click ▸ for activity scores", ()
+                else:
+                    details, tags = f"≈ Closest found, {miss:+.2f} off target", ("approximate",)
+                values = (*grades, f"{final:.2f}", transmute(final), details)
+                self.tree.insert("", "end", iid=str(i), text=label, values=values, tags=tags)
+                # Placeholder so the row can be opened; replaced on first open
+                self.tree.insert(str(i), "end", iid=f"{i}:pending")
+        self.order = [str(i) for i in range(len(results))]
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+    
+    @staticmethod
+    def miss_note(telemetry):
+        """How close the solver got to a failed target"""
+        if not telemetry or telemetry["best_distance"] is None:
+            return ""
+        how = "no exact fit exists" if telemetry["exhaustive"] else f"{telemetry['attempts']:,} tries"
+        return f" Closest: {telemetry['best_distance']:.2f} off ({telemetry['method']}, {how})"
+    
+    def on_open(self, event):
+        item = self.tree.focus()
+        if not self.tree.exists(f"{item}:pending"):
+            return
+        self.tree.delete(f"{item}:pending")
+        index = int(item)
+        grades = self.results.component_grades(index)
+        for column, (comp, scores) in enumerate(zip(self.COMPONENTS, self.results.component_scores(index))):
+            grade = grades[column]
+            values = ["", "", "", "", "", "Scores: " + ", ".join(map(str, scores))]
+            values[column] = f"{grade:.2f}"
+            self.tree.insert(item, "end", text=comp, values=values)
+    
+    def sort_key(self, column):
+        if column == "#0":
+            return int
+        
+        def key(item):
+            value = self.tree.set(item, column)
+            try:
+                return (0, float(value))
+            except ValueError:
+                return (1, value)
+        return key
+    
+    def sort_by(self, column):
+        """Sort on a heading click; clicking the same heading again reverses the order"""
+        self.sort_reverse = not self.sort_reverse if column == self.sort_column else False
+        self.sort_column = column
+        self.order.sort(key=self.sort_key(column), reverse=self.sort_reverse)
+        self.apply_filter(self.current_filter)
+    
+    def status(self, index):
+        """"Errors", "Approximate" or "Solved" for one student"""
+        if self.results.failed[index]:
+            return "Errors"
+        return "Solved" if math.isnan(self.results.miss[index]) else "Approximate"
+    
+    def apply_filter(self, name):
+        """Show all students or only those of one status; returns how many are shown"""
+        self.current_filter = name
+        self.tree.detach(*self.order)
+        shown = [item for item in self.order if name == "All" or self.status(int(item)) == name]
+        for position, item in enumerate(shown):
+            self.tree.reattach(item, "", position)
+        return len(shown)
+
 # ================== Main Application ==================
 class GradeGeneratorApp:
+    # Least total score difference between the rows of two students with the same target
+    MIN_ROW_DIFFERENCE = 3
+    # Solver choices shown in the generate bar; the samplers keep their rows in the solution cache
+    SOLVER_METHODS = {"Exact search": "exact", "NumPy sampler": "numpy", "Random sampler": "random"}
+    
     def __init__(self):
         self.root = tk.Tk()
         self.setup_window()
         self.entries = {}
-        self.target_entries = []
+        self.target_values = []
         self.subject_var = tk.StringVar()
         self.generated_results = []
+        self.workers_var = tk.IntVar(value=1)
+        self.generation_thread = None
+        # Optional solve_class hook (e.g. grading.cprofile_hook) for profiling generation;
+        # only used when solving in this process
+        self.solve_hook = None
+        # (targets, results) of the last finished run, for incremental regeneration
+        self.last_generation = None
+        self.incremental_var = tk.BooleanVar(value=True)
+        # Plain copy of the checkbox, since the worker thread must not read Tk variables
+        self.transmuted = False
+        self.transmuted_var = tk.BooleanVar(value=False)
+        # Seconds the whole class may take to solve; 0 means no limit
+        self.time_limit_var = tk.DoubleVar(value=0)
+        # Plain copy of the solver choice, for the same reason as transmuted
+        self.method = "exact"
+        self.method_var = tk.StringVar(value="Exact search")
+        self.term_sheets = []
+        self.roster_names = None
+        self.roster_targets = None
+        self.roster_file = None
+        # Text of every setup field as last validated, kept for going back and for snapshots
+        self.form_values = {}
+        # Config the last results were solved with, seed included
+        self.generation_config = None
+        # Only the sampling methods use the cache, so the file is opened once one of them runs
+        self.solution_cache = SolutionCache(SOLUTION_CACHE_PATH)
         
         # Initialize with first screen
         self.build_initial_form()
@@ -325,6 +485,52 @@ class GradeGeneratorApp:
             fg=ModernStyle.TEXT_SECONDARY
         )
         instruction_label.pack()
+        
+        # Pick up where the last session left off
+        session_frame = tk.Frame(main_frame, bg=ModernStyle.BACKGROUND)
+        session_frame.pack(pady=(10, 0))
+        
+        if os.path.exists(SESSION_PATH):
+            resume_btn = create_modern_button(
+                session_frame, "⟲ Resume Last Session", lambda: self.open_session(SESSION_PATH),
+                bg_color=ModernStyle.SUCCESS, width=20
+            )
+            resume_btn.pack(side="left", padx=(0, 10))
+        
+        open_btn = create_modern_button(
+            session_frame, "📂 Open Session", self.open_session,
+            bg_color=ModernStyle.TEXT_SECONDARY, width=15
+        )
+        open_btn.pack(side="left", padx=(0, 10))
+        
+        record_btn = create_modern_button(
+            session_frame, "🧮 Grade Recorded Scores", self.grade_recorded_scores,
+            bg_color=ModernStyle.ACCENT, width=22
+        )
+        record_btn.pack(side="left")
+    
+    def grade_recorded_scores(self):
+        """Fill in the grades of a class record of real scores; nothing is solved"""
+        path = filedialog.askopenfilename(
+            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            title="Open Class Record"
+        )
+        if not path:
+            return
+        
+        summaries = []
+        if not _save_with_dialog(lambda filename: summaries.extend(grade_class_record(path, filename))):
+            return
+        problems = [
+            f"{summary['title']} row {row}: {message}"
+            for summary in summaries for row, message in summary["errors"].items()
+        ]
+        if problems:
+            more = f"\n...and {len(problems) - 10} more" if len(problems) > 10 else ""
+            messagebox.showwarning(
+                "Class Record",
+                f"{len(problems)} student(s) could not be graded and are marked ERROR:\n" + "\n".join(problems[:10]) + more
+            )
     
     def build_form(self):
         """Build compact form for entering grade parameters"""
@@ -374,28 +580,136 @@ class GradeGeneratorApp:
         # Written Works section
         self.create_section(left_frame, "📝 Written Works", [
             ("Written Count", "Activities count"),
-            ("Written Perfects", "Perfect scores (comma-separated)")
+            ("Written Perfects", "Perfect scores (comma-separated)"),
+            ("Score Floor %", "Optional: lowest score on any activity")
         ])
         
         # Performance Tasks section
         self.create_section(middle_frame, "🎯 Performance Tasks", [
             ("Performance Count", "Tasks count"),
-            ("Performance Perfects", "Perfect scores (comma-separated)")
+            ("Performance Perfects", "Perfect scores (comma-separated)"),
+            ("Max Spread %", "Optional: widest gap between activities")
         ])
         
         # Assessment + Students section
         self.create_section(right_frame, "📊 Assessment & Students", [
             ("Assessment Count", "Assessments count"),
             ("Assessment Perfects", "Perfect scores (comma-separated)"),
-            ("Number of Students", "Total students")
+            ("Number of Students", "Total students"),
+            ("Max Deviation %", "Optional: farthest any activity is from the target")
         ])
         
+        for field_name, value in self.form_values.items():
+            if field_name in self.entries:
+                self.entries[field_name].insert(0, value)
+        
         # Next button at bottom
         button_frame = tk.Frame(content_frame, bg=ModernStyle.SURFACE)
         button_frame.pack(side="bottom", pady=(15, 0))
         
+        import_btn = create_modern_button(
+            button_frame, "📂 Import Roster", self.import_roster,
+            bg_color=ModernStyle.TEXT_SECONDARY, width=15
+        )
+        import_btn.pack(side="left", padx=(0, 10))
+        
         next_btn = create_modern_button(button_frame, "Next →", self.build_targets, width=15)
-        next_btn.pack()
+        next_btn.pack(side="left")
+    
+    def import_roster(self):
+        """Load names and targets from a CSV/XLSX file instead of typing them in"""
+        if not self.read_form(require_students=False):
+            return
+        
+        path = filedialog.askopenfilename(
+            filetypes=[("Roster files", "*.csv *.xlsx"), ("All files", "*.*")],
+            title="Import Roster"
+        )
+        if not path:
+            return
+        
+        try:
+            self.roster_names, self.roster_targets = read_roster(path)
+        except ImportError:
+            messagebox.showerror("Import Error", "Required libraries not found. Please install:\npip install openpyxl")
+            return
+        except Exception as e:
+            messagebox.showerror("Import Error", str(e))
+            return
+        
+        self.num_students = len(self.roster_targets)
+        self.target_values = []
+        self.roster_file = os.path.basename(path)
+        self.build_roster_summary(self.roster_file)
+    
+    def build_roster_summary(self, filename):
+        """Summary screen for an imported roster; no per-student widgets are built"""
+        self.clear_window()
+        
+        # Main container
+        main_frame = tk.Frame(self.root, bg=ModernStyle.BACKGROUND)
+        main_frame.pack(expand=True, fill="both", padx=30, pady=20)
+        
+        # Compact header
+        header_frame = tk.Frame(main_frame, bg=ModernStyle.BACKGROUND)
+        header_frame.pack(fill="x", pady=(0, 15))
+        
+        back_btn = create_modern_button(
+            header_frame, "← Back", self.build_form, 
+            bg_color=ModernStyle.TEXT_SECONDARY, width=8
+        )
+        back_btn.pack(side="left")
+        
+        title_label = tk.Label(
+            header_frame,
+            text=f"Imported Roster - {self.num_students} Students",
+            font=ModernStyle.FONT_TITLE,
+            bg=ModernStyle.BACKGROUND,
+            fg=ModernStyle.PRIMARY
+        )
+        title_label.pack(side="left", padx=(15, 0))
+        
+        card_frame = tk.Frame(main_frame, bg=ModernStyle.SURFACE, relief="solid", bd=1)
+        card_frame.pack(fill="both", expand=True, pady=10)
+        
+        content_frame = tk.Frame(card_frame, bg=ModernStyle.SURFACE)
+        content_frame.pack(padx=25, pady=20, fill="both", expand=True)
+        
+        targets = self.roster_targets
+        summary = (
+            f"📂 {filename}\n\n"
+            f"Students: {len(targets)}\n"
+            f"Lowest target: {min(targets):.2f}%    "
+            f"Average: {sum(targets) / len(targets):.2f}%    "
+            f"Highest: {max(targets):.2f}%"
+        )
+        summary_label = tk.Label(
+            content_frame,
+            text=summary,
+            font=ModernStyle.FONT_MEDIUM,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_PRIMARY,
+            justify="left"
+        )
+        summary_label.pack(anchor="w", pady=(0, 10))
+        
+        self.target_status_label = tk.Label(
+            content_frame,
+            text="",
+            font=ModernStyle.FONT_SMALL,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_SECONDARY
+        )
+        self.target_status_label.pack(anchor="w")
+        
+        self.build_generate_bar(content_frame)
+        self.check_targets()
+    
+    def current_targets(self):
+        """Target grades from the imported roster, or from the entry fields"""
+        if self.roster_targets is not None:
+            return list(self.roster_targets)
+        return [float(value) for value in self.target_values]
     
     def create_section(self, parent, title, fields):
         """Create a compact section with fields"""
@@ -437,8 +751,8 @@ class GradeGeneratorApp:
             
             self.entries[field_name] = entry
     
-    def build_targets(self):
-        """Build compact target grades input form"""
+    def read_form(self, require_students=True):
+        """Validate the setup form and store its values; returns False after showing any error"""
         try:
             # Validate and store form data
             subject = self.subject_var.get()
@@ -456,14 +770,43 @@ class GradeGeneratorApp:
             a_count = int(self.entries["Assessment Count"].get())
             self.a_perfect = list(map(int, self.entries["Assessment Perfects"].get().split(',')))
 
-            self.num_students = int(self.entries["Number of Students"].get())
+            if require_students:
+                self.num_students = int(self.entries["Number of Students"].get())
             
             if len(self.w_perfect) != w_count or len(self.p_perfect) != p_count or len(self.a_perfect) != a_count:
                 raise ValueError("Mismatch in activity count and scores.")
+            
+            # Realism limits are optional; a blank field means no limit
+            self.constraints = {}
+            for field, key in (("Score Floor %", "floor"), ("Max Spread %", "spread"), ("Max Deviation %", "deviation")):
+                text = self.entries[field].get().strip()
+                if text:
+                    value = float(text)
+                    if not 0 <= value <= 100:
+                        raise ValueError(f"{field} must be between 0 and 100.")
+                    self.constraints[key] = value
 
         except Exception as e:
             messagebox.showerror("Input Error", str(e))
+            return False
+        self.form_values = {name: entry.get() for name, entry in self.entries.items()}
+        
+        try:
+            self.grade_index = AchievableGradeIndex(
+                self.w_perfect, self.p_perfect, self.a_perfect,
+                self.w_weight, self.p_weight, self.a_weight
+            )
+        except ValueError:
+            # Too large to index; targets are then only checked by the solver
+            self.grade_index = None
+        return True
+    
+    def build_targets(self):
+        """Build compact target grades input form"""
+        if not self.read_form():
             return
+        self.roster_names = None
+        self.roster_targets = None
         
         self.clear_window()
         
@@ -506,93 +849,400 @@ class GradeGeneratorApp:
             bg=ModernStyle.SURFACE,
             fg=ModernStyle.ACCENT
         )
-        list_header.pack(pady=(0, 15))
+        list_header.pack(pady=(0, 5))
         
-        # Create scrollable frame for many students
-        students_frame = tk.Frame(content_frame, bg=ModernStyle.SURFACE)
-        students_frame.pack(fill="both", expand=True)
+        self.target_status_label = tk.Label(
+            content_frame,
+            text="",
+            font=ModernStyle.FONT_SMALL,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_SECONDARY
+        )
+        self.target_status_label.pack(pady=(0, 10))
         
-        # Create columns based on number of students
+        # Only the rows on screen get widgets; the grid scrolls over the backing list.
+        # Targets typed before going back are kept, so only real edits get re-solved
+        self.target_values = (self.target_values + ["85.0"] * self.num_students)[:self.num_students]  # Default grade
+        self.flagged_targets = set()
+        self.build_generate_bar(content_frame)
         cols = 3 if self.num_students > 15 else 2 if self.num_students > 8 else 1
-        
-        # Create column frames
-        column_frames = []
-        for i in range(cols):
-            col_frame = tk.Frame(students_frame, bg=ModernStyle.SURFACE)
-            col_frame.pack(side="left", fill="both", expand=True, padx=(0, 10 if i < cols-1 else 0))
-            column_frames.append(col_frame)
-        
-        # Distribute students across columns
-        self.target_entries.clear()
-        students_per_col = (self.num_students + cols - 1) // cols
-        
-        for i in range(self.num_students):
-            col_index = i // students_per_col
-            if col_index >= cols:
-                col_index = cols - 1
-                
-            parent_frame = column_frames[col_index]
-            
-            student_frame = tk.Frame(parent_frame, bg=ModernStyle.SURFACE)
-            student_frame.pack(fill="x", pady=2)
-            
-            # Horizontal layout for each student
-            label = tk.Label(
-                student_frame,
-                text=f"Student {i+1}:",
-                font=ModernStyle.FONT_MEDIUM,
-                bg=ModernStyle.SURFACE,
-                fg=ModernStyle.TEXT_PRIMARY,
-                width=12,
-                anchor="w"
-            )
-            label.pack(side="left")
-            
-            entry = create_modern_entry(student_frame, width=10)
-            entry.pack(side="left", padx=(5, 0))
-            entry.insert(0, "85.0")  # Default grade
-            
-            percent_label = tk.Label(
-                student_frame,
-                text="%",
-                font=ModernStyle.FONT_MEDIUM,
-                bg=ModernStyle.SURFACE,
-                fg=ModernStyle.TEXT_SECONDARY
-            )
-            percent_label.pack(side="left", padx=(2, 0))
-            
-            self.target_entries.append(entry)
-        
+        self.target_grid = VirtualTargetGrid(
+            content_frame, self.target_values, cols,
+            on_edit=self.check_target, is_flagged=lambda i: i in self.flagged_targets
+        )
+        self.check_targets()
+    
+    def build_generate_bar(self, content_frame):
+        """Worker count, Snap Targets and Generate Grades buttons under the target list"""
         # Generate button at bottom
         button_frame = tk.Frame(content_frame, bg=ModernStyle.SURFACE)
-        button_frame.pack(pady=(20, 0))
+        button_frame.pack(side="bottom", pady=(20, 0))
+        
+        workers_label = tk.Label(
+            button_frame,
+            text="Worker processes:",
+            font=ModernStyle.FONT_SMALL,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_SECONDARY
+        )
+        workers_label.pack(side="left")
+        
+        workers_spin = tk.Spinbox(
+            button_frame,
+            from_=1,
+            to=os.cpu_count() or 1,
+            textvariable=self.workers_var,
+            font=ModernStyle.FONT_SMALL,
+            width=4,
+            state="readonly"
+        )
+        workers_spin.pack(side="left", padx=(5, 20))
+        
+        time_limit_label = tk.Label(
+            button_frame,
+            text="Time limit (s, 0 = none):",
+            font=ModernStyle.FONT_SMALL,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_SECONDARY
+        )
+        time_limit_label.pack(side="left")
+        
+        time_limit_spin = tk.Spinbox(
+            button_frame,
+            from_=0,
+            to=600,
+            increment=1,
+            textvariable=self.time_limit_var,
+            font=ModernStyle.FONT_SMALL,
+            width=5
+        )
+        time_limit_spin.pack(side="left", padx=(5, 20))
+        
+        method_label = tk.Label(
+            button_frame,
+            text="Solver:",
+            font=ModernStyle.FONT_SMALL,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_SECONDARY
+        )
+        method_label.pack(side="left")
+        
+        method_box = ttk.Combobox(
+            button_frame,
+            textvariable=self.method_var,
+            values=list(self.SOLVER_METHODS),
+            state="readonly",
+            font=ModernStyle.FONT_SMALL,
+            width=14
+        )
+        method_box.bind("<<ComboboxSelected>>", lambda e: self.select_method())
+        method_box.pack(side="left", padx=(5, 20))
+        
+        incremental_check = tk.Checkbutton(
+            button_frame,
+            text="Only re-solve changed students",
+            variable=self.incremental_var,
+            font=ModernStyle.FONT_SMALL,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_SECONDARY,
+            activebackground=ModernStyle.SURFACE
+        )
+        incremental_check.pack(side="left", padx=(0, 20))
+        
+        transmuted_check = tk.Checkbutton(
+            button_frame,
+            text="Targets are transmuted grades",
+            variable=self.transmuted_var,
+            command=self.toggle_transmuted,
+            font=ModernStyle.FONT_SMALL,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_SECONDARY,
+            activebackground=ModernStyle.SURFACE
+        )
+        transmuted_check.pack(side="left", padx=(0, 20))
+        
+        snap_btn = create_modern_button(
+            button_frame, "🎯 Snap Targets", self.snap_targets,
+            bg_color=ModernStyle.WARNING, width=14
+        )
+        snap_btn.pack(side="left", padx=(0, 10))
         
         generate_btn = create_modern_button(
             button_frame, "🚀 Generate Grades", self.generate_grades, 
             bg_color=ModernStyle.SUCCESS, width=18
         )
-        generate_btn.pack()
+        generate_btn.pack(side="left")
+    
+    def unreachable_targets(self, targets):
+        """Map roster position to the nearest achievable grade for targets the index rules out
+
+        Targets that aren't grades in the current mode at all are left to invalid_targets.
+        """
+        if self.grade_index is None:
+            return {}
+        config = self.grading_config()
+        unreachable = {}
+        for i, target in enumerate(targets):
+            try:
+                center, tolerance = target_window(target, config)
+            except ValueError:
+                continue
+            if not self.grade_index.is_achievable(center, tolerance):
+                unreachable[i] = self.grade_index.nearest(center)
+        return unreachable
+    
+    def invalid_targets(self, targets):
+        """Positions of targets that aren't grades in the current mode, like 85.5 as a transmuted grade"""
+        config = self.grading_config()
+        invalid = []
+        for i, target in enumerate(targets):
+            try:
+                target_window(target, config)
+            except ValueError:
+                invalid.append(i)
+        return invalid
+    
+    def snapped_target(self, target):
+        """The achievable target closest to target, in the current target mode"""
+        if self.transmuted:
+            # Transmuted grades are whole numbers from 60 to 100
+            target = min(max(round(target), TRANSMUTATION_TABLE[-1][1]), TRANSMUTATION_TABLE[0][1])
+            return transmute(self.grade_index.nearest(target_window(target, self.grading_config())[0]))
+        return self.grade_index.snap(target, self.grading_config().get("tolerance", 0.01))
+    
+    def target_problem(self, value):
+        """True when a typed target is not a number or can't be reached"""
+        try:
+            return bool(self.unreachable_targets([float(value)]) or self.invalid_targets([float(value)]))
+        except ValueError:
+            return True
+    
+    def check_target(self, index):
+        """Re-check the one target that was just edited"""
+        if self.target_problem(self.target_values[index]):
+            self.flagged_targets.add(index)
+        else:
+            self.flagged_targets.discard(index)
+        self.target_grid.refresh_flags()
+        self.show_target_status(len(self.flagged_targets))
+    
+    def check_targets(self):
+        """Flag every target that can't be reached and summarise them above the list"""
+        if self.roster_targets is not None:
+            problems = set(self.unreachable_targets(self.roster_targets)) | set(self.invalid_targets(self.roster_targets))
+            self.show_target_status(len(problems))
+            return
+        # Classes repeat the same few targets, so each distinct value is only checked once
+        problems = {value: self.target_problem(value) for value in set(self.target_values)}
+        self.flagged_targets = {i for i, value in enumerate(self.target_values) if problems[value]}
+        self.target_grid.refresh_flags()
+        self.show_target_status(len(self.flagged_targets))
+    
+    def show_target_status(self, flagged):
+        if flagged:
+            self.target_status_label.config(
+                text=f"⚠ {flagged} target(s) can't be reached with these perfect scores - use Snap Targets",
+                fg=ModernStyle.ERROR
+            )
+        else:
+            self.target_status_label.config(text="All targets are achievable", fg=ModernStyle.TEXT_SECONDARY)
+    
+    def snap_targets(self):
+        """Replace every unreachable target with the nearest achievable grade"""
+        if self.grade_index is None:
+            return
+        if self.roster_targets is not None:
+            problems = set(self.unreachable_targets(self.roster_targets)) | set(self.invalid_targets(self.roster_targets))
+            for i in problems:
+                self.roster_targets[i] = self.snapped_target(self.roster_targets[i])
+        else:
+            for i, value in enumerate(self.target_values):
+                try:
+                    if self.unreachable_targets([float(value)]) or self.invalid_targets([float(value)]):
+                        self.target_values[i] = str(self.snapped_target(float(value)))
+                except ValueError:
+                    continue
+            self.target_grid.render()
+        self.check_targets()
+    
+    def grading_config(self):
+        """Collect the validated form values in the shape solve_class expects"""
+        return {
+            "w_perfect": self.w_perfect,
+            "p_perfect": self.p_perfect,
+            "a_perfect": self.a_perfect,
+            "w_weight": self.w_weight,
+            "p_weight": self.p_weight,
+            "a_weight": self.a_weight,
+            "constraints": self.constraints or None,
+            "transmuted": self.transmuted,
+            "method": self.method,
+            # Students sharing a target (everyone starts at 85.0) still get different rows
+            "distinct": True,
+            "min_difference": self.MIN_ROW_DIFFERENCE,
+        }
+    
+    def select_method(self):
+        self.method = self.SOLVER_METHODS[self.method_var.get()]
+    
+    def toggle_transmuted(self):
+        """Switch between raw initial-grade targets and transmuted-grade targets"""
+        self.transmuted = self.transmuted_var.get()
+        self.check_targets()
     
     def generate_grades(self):
-        """Generate grades and show results"""
+        """Start solving in a background thread and show a progress dialog"""
+        if self.generation_thread is not None and self.generation_thread.is_alive():
+            return
+        try:
+            targets = self.current_targets()
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        invalid = self.invalid_targets(targets)
+        if invalid:
+            messagebox.showerror(
+                "Error",
+                f"{len(invalid)} target(s), e.g. {targets[invalid[0]]:g}, are not transmuted grades "
+                "(whole numbers from 60 to 100). Fix them or use Snap Targets."
+            )
+            return
+        
+        config = self.grading_config()
+        try:
+            time_limit = self.time_limit_var.get()
+        except tk.TclError:
+            messagebox.showerror("Error", "The time limit must be a number of seconds.")
+            return
+        if time_limit > 0:
+            # Out of time, students get the closest row found so far instead of an error
+            config["class_budget_ms"] = time_limit * 1000
+        # A fresh seed per run, recorded with the results so a snapshot says how they were drawn
+        config["seed"] = random.SystemRandom().randrange(2 ** 32)
+        self.generation_config = config
+        workers = self.workers_var.get()
+        previous = self.last_generation if self.incremental_var.get() else None
+        self.generation_targets = targets
+        self.generation_progress = (0, len(targets))
+        self.generation_outcome = None
+        self.generation_started = time.perf_counter()
+        self.cancel_event = threading.Event()
+        
+        self.generation_thread = threading.Thread(
+            target=self.run_generation, args=(targets, config, workers, previous), daemon=True
+        )
+        self.build_progress_window(len(targets))
+        self.generation_thread.start()
+        self.root.after(100, self.poll_generation)
+    
+    def run_generation(self, targets, config, workers, previous=None):
+        """Worker thread body; must not touch any Tk widget, and must always set generation_outcome"""
         try:
-            results = []
-            for entry in self.target_entries:
-                grade = float(entry.get())
-                result = find_combination(
-                    self.w_perfect, self.p_perfect, self.a_perfect, 
-                    self.w_weight, self.p_weight, self.a_weight, grade
+            # Rows of the previous run that still fit the new inputs are kept as they are
+            if previous is not None:
+                reused = reuse_results(*previous, targets, config)
+            else:
+                reused = [None] * len(targets)
+            # Targets the index already rules out are reported without spending any solve time,
+            # unless a time limit is set: then, as in the CLI, they get the closest row instead
+            if config.get("class_budget_ms") or config.get("student_budget_ms"):
+                unreachable = {}
+            else:
+                unreachable = self.unreachable_targets(targets)
+            to_solve = [t for i, t in enumerate(targets) if i not in unreachable and reused[i] is None]
+            skipped = len(targets) - len(to_solve)
+            
+            def progress(done, total):
+                self.generation_progress = (done + skipped, len(targets))
+            
+            if workers > 1:
+                solved = solve_class_parallel(
+                    to_solve, config, workers, progress, self.cancel_event, self.solution_cache
                 )
-                if result:
-                    results.append(result)
+            else:
+                solved = solve_class(
+                    to_solve, config, progress, self.cancel_event, self.solution_cache, self.solve_hook
+                )
+            solved = iter(solved)
+            results = ResultStore.for_config(config)
+            for i, target in enumerate(targets):
+                if reused[i] is not None:
+                    results.append(reused[i])
+                elif i in unreachable:
+                    results.append({
+                        "Final Grade": target,
+                        "Error": f"Target can't be reached with these perfect scores (nearest: {unreachable[i]:.2f}).",
+                        "Telemetry": solver_telemetry(
+                            "index", target, {"best_distance": abs(unreachable[i] - target)}, 0.0, exhaustive=True
+                        )
+                    })
                 else:
-                    results.append({"Final Grade": grade, "Error": "No matching combination found."})
-
-            self.generated_results = results
-            self.show_results(results)
-            
+                    results.append(next(solved))
+            self.generation_outcome = ("done", results)
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self.generation_outcome = ("error", e)
+    
+    def build_progress_window(self, total):
+        """Small modal window with a progress bar and a Cancel button"""
+        self.progress_window = tk.Toplevel(self.root)
+        self.progress_window.title("Generating Grades")
+        self.progress_window.geometry("420x170")
+        self.progress_window.configure(bg=ModernStyle.SURFACE)
+        self.progress_window.resizable(False, False)
+        self.progress_window.transient(self.root)
+        self.progress_window.protocol("WM_DELETE_WINDOW", self.cancel_generation)
+        
+        self.progress_label = tk.Label(
+            self.progress_window,
+            text=f"Solved 0 of {total} students",
+            font=ModernStyle.FONT_MEDIUM,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_PRIMARY
+        )
+        self.progress_label.pack(pady=(20, 10))
+        
+        self.progress_bar = ttk.Progressbar(
+            self.progress_window, orient="horizontal", length=360, mode="determinate", maximum=max(total, 1)
+        )
+        self.progress_bar.pack()
+        
+        self.cancel_btn = create_modern_button(
+            self.progress_window, "Cancel", self.cancel_generation,
+            bg_color=ModernStyle.ERROR, width=10
+        )
+        self.cancel_btn.pack(pady=(15, 0))
+        # Grabbing an unmapped window fails on some platforms
+        self.progress_window.wait_visibility()
+        self.progress_window.grab_set()
+    
+    def cancel_generation(self):
+        """Stop after the students already being solved; the rest are kept as cancelled"""
+        self.cancel_event.set()
+        self.cancel_btn.config(state="disabled", text="Cancelling...")
+    
+    def poll_generation(self):
+        """Refresh the progress dialog from the worker thread's state"""
+        done, total = self.generation_progress
+        elapsed = time.perf_counter() - self.generation_started
+        self.progress_bar["value"] = done
+        self.progress_label.config(text=f"Solved {done} of {total} students  ·  {elapsed:.1f}s")
+        
+        if self.generation_outcome is None:
+            self.root.after(100, self.poll_generation)
+            return
+        
+        self.progress_window.grab_release()
+        self.progress_window.destroy()
+        status, value = self.generation_outcome
+        if status == "error":
+            messagebox.showerror("Error", str(value))
+            return
+        if self.roster_names is not None:
+            value.set_names(self.roster_names)
+        self.last_generation = (self.generation_targets, value)
+        self.generated_results = value
+        self.autosave()
+        self.show_results(value)
     
     def show_results(self, results):
         """Show results in a compact window"""
@@ -621,58 +1271,111 @@ class GradeGeneratorApp:
         )
         title_label.pack(side="left")
         
+        stats = self.solution_cache.stats()
+        if stats["hits"] or stats["misses"]:
+            cache_label = tk.Label(
+                header_frame,
+                text=f"Cache: {stats['hits']} hits / {stats['misses']} misses",
+                font=ModernStyle.FONT_SMALL,
+                bg=ModernStyle.BACKGROUND,
+                fg=ModernStyle.TEXT_SECONDARY
+            )
+            cache_label.pack(side="left", padx=(15, 0))
+        
         export_btn = create_modern_button(
             header_frame, "📊 Export to Excel", self.export_to_excel, 
             bg_color=ModernStyle.SUCCESS, width=15
         )
         export_btn.pack(side="right")
         
+        term_export_btn = create_modern_button(
+            header_frame, "📚 Export Term", self.export_term_workbook,
+            bg_color=ModernStyle.ACCENT, width=12
+        )
+        term_export_btn.pack(side="right", padx=(0, 10))
+        
+        add_term_btn = create_modern_button(
+            header_frame, "➕ Add to Term", lambda: self.add_to_term_workbook(result_window),
+            bg_color=ModernStyle.ACCENT, width=12
+        )
+        add_term_btn.pack(side="right", padx=(0, 10))
+        
+        save_session_btn = create_modern_button(
+            header_frame, "💾 Save Session", lambda: create_session_file(self.session_snapshot()),
+            bg_color=ModernStyle.TEXT_SECONDARY, width=13
+        )
+        save_session_btn.pack(side="right", padx=(0, 10))
+        
         # Results display
         results_frame = tk.Frame(result_window, bg=ModernStyle.SURFACE, relief="solid", bd=1)
         results_frame.pack(fill="both", expand=True, padx=25, pady=(0, 25))
         
-        # Create text widget with scrollbar
-        text_frame = tk.Frame(results_frame, bg=ModernStyle.SURFACE)
-        text_frame.pack(fill="both", expand=True, padx=15, pady=15)
+        # Filter bar above the table
+        filter_frame = tk.Frame(results_frame, bg=ModernStyle.SURFACE)
+        filter_frame.pack(fill="x", padx=15, pady=(15, 0))
         
-        text_widget = tk.Text(
-            text_frame,
-            wrap=tk.WORD,
-            font=("Consolas", 9),
+        filter_label = tk.Label(
+            filter_frame,
+            text="Show:",
+            font=ModernStyle.FONT_SMALL,
             bg=ModernStyle.SURFACE,
-            fg=ModernStyle.TEXT_PRIMARY,
-            bd=0,
-            highlightthickness=0
+            fg=ModernStyle.TEXT_SECONDARY
         )
+        filter_label.pack(side="left")
         
-        scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=text_widget.yview)
-        text_widget.configure(yscrollcommand=scrollbar.set)
+        filter_var = tk.StringVar(value="All")
+        filter_box = ttk.Combobox(
+            filter_frame,
+            textvariable=filter_var,
+            values=list(ResultsTable.FILTERS),
+            state="readonly",
+            font=ModernStyle.FONT_SMALL,
+            width=10
+        )
+        filter_box.pack(side="left", padx=(5, 15))
         
-        text_widget.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        count_label = tk.Label(
+            filter_frame,
+            font=ModernStyle.FONT_SMALL,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_SECONDARY
+        )
+        count_label.pack(side="left")
         
-        # Format and insert results
-        msg = ""
-        for i, res in enumerate(results):
-            msg += f"{'='*60}\n"
-            msg += f"STUDENT {i+1} - Target Grade: {res['Final Grade']}%\n"
-            msg += f"{'='*60}\n"
-            
-            if "Error" in res:
-                msg += f"❌ {res['Error']}\n\n"
-            else:
-                components = ["Written Works", "Performance Task", "Quarterly Assessment"]
-                for comp in components:
-                    scores = res[comp][0]
-                    grade = res[comp][1]
-                    msg += f"{comp}:\n"
-                    msg += f"  Scores: {scores}\n"
-                    msg += f"  Grade: {grade:.2f}%\n\n"
-                msg += f"✅ Final Grade: {res['Final Grade']}%\n"
-            msg += "\n"
-        
-        text_widget.insert("1.0", msg)
-        text_widget.config(state="disabled")
+        table_frame = tk.Frame(results_frame, bg=ModernStyle.SURFACE)
+        table_frame.pack(fill="both", expand=True, padx=15, pady=15)
+        table = ResultsTable(table_frame, results)
+        
+        def apply_filter(event=None):
+            shown = table.apply_filter(filter_var.get())
+            failed, approximate = results.failures, results.approximations
+            count_label.config(
+                text=f"{shown} shown  ·  {len(results) - failed - approximate} solved  ·  "
+                     f"{approximate} approximate  ·  {failed} failed"
+            )
+        
+        filter_box.bind("<<ComboboxSelected>>", apply_filter)
+        apply_filter()
+        
+        diagnostics_btn = create_modern_button(
+            filter_frame, "🩺 Diagnostics", lambda: create_diagnostics_file(results),
+            bg_color=ModernStyle.SECONDARY, width=12
+        )
+        diagnostics_btn.pack(side="right")
+        
+        summary = solver_summary(results)
+        methods = ", ".join(f"{count} {method}" for method, count in summary["methods"].items())
+        summary_label = tk.Label(
+            filter_frame,
+            text=f"Solver: {summary['seconds']:.2f}s, slowest {summary['slowest'] * 1000:.0f} ms  ·  {methods}"
+                 + (f"  ·  {summary['impossible']} impossible, {summary['gave_up']} gave up"
+                    if summary['impossible'] or summary['gave_up'] else "")
+                 + (f"  ·  {summary['timed_out']} out of time" if summary['timed_out'] else ""),
+            font=ModernStyle.FONT_SMALL,
+            bg=ModernStyle.SURFACE,
+            fg=ModernStyle.TEXT_SECONDARY
+        )
+        summary_label.pack(side="right", padx=(0, 10))
     
     def export_to_excel(self):
         """Export results to Excel"""
@@ -686,8 +1389,128 @@ class GradeGeneratorApp:
             self.w_weight, self.p_weight, self.a_weight
         )
     
+    def add_to_term_workbook(self, parent):
+        """Keep the current results as one sheet of the term workbook"""
+        if not self.generated_results:
+            messagebox.showwarning("Warning", "No grades generated yet!")
+            return
+        
+        section = simpledialog.askstring("Section", "Section name for this sheet:", parent=parent)
+        if section is None:
+            return
+        
+        sheet = dict(self.grading_config())
+        sheet.update(subject=self.subject_var.get(), section=section.strip() or None,
+                     results=self.generated_results)
+        self.term_sheets.append(sheet)
+        messagebox.showinfo("Term Workbook", f"Added. The term workbook now has {len(self.term_sheets)} sheet(s).",
+                            parent=parent)
+    
+    def export_term_workbook(self):
+        """Export every sheet added this session into a single workbook"""
+        if not self.term_sheets:
+            messagebox.showwarning("Warning", "No sheets added to the term workbook yet!")
+            return
+        
+        create_excel_workbook(self.term_sheets)
+    
+    def session_snapshot(self):
+        """Everything needed to reopen this session: setup, targets and the last results"""
+        try:
+            time_limit = self.time_limit_var.get()
+        except tk.TclError:
+            time_limit = 0
+        session = {
+            "subject": self.subject_var.get(),
+            "fields": self.form_values,
+            "target_values": self.target_values,
+            "roster_names": self.roster_names,
+            "roster_file": self.roster_file,
+            "transmuted": self.transmuted,
+            "time_limit": time_limit,
+            "method": self.method_var.get(),
+            "workers": self.workers_var.get(),
+            "incremental": self.incremental_var.get(),
+        }
+        if self.roster_targets is not None:
+            session["roster_targets"] = array("d", self.roster_targets)
+        if self.last_generation is not None:
+            targets, results = self.last_generation
+            session["config"] = self.generation_config
+            session["generation_targets"] = array("d", targets)
+            session["results"] = results
+        return session
+    
+    def autosave(self):
+        """Quietly snapshot the session to SESSION_PATH; a failed autosave must not interrupt anything"""
+        if not self.subject_var.get():
+            return
+        try:
+            save_session(SESSION_PATH, self.session_snapshot())
+        except (OSError, tk.TclError):
+            pass
+    
+    def open_session(self, path=None):
+        """Restore a snapshot: the setup form, the targets and, without re-solving, the results"""
+        if path is None:
+            path = filedialog.askopenfilename(
+                filetypes=[("Session files", f"*{SESSION_EXTENSION}"), ("All files", "*.*")],
+                title="Open Session"
+            )
+            if not path:
+                return
+        try:
+            session = load_session(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Session Error", f"Can't open the session:\n{e}")
+            return
+        if session.get("subject") not in subject_weights:
+            messagebox.showerror("Session Error", "The session's subject is not available.")
+            return
+        
+        self.subject_var.set(session["subject"])
+        self.form_values = dict(session.get("fields", {}))
+        self.transmuted = bool(session.get("transmuted"))
+        self.transmuted_var.set(self.transmuted)
+        self.time_limit_var.set(session.get("time_limit", 0))
+        if session.get("method") in self.SOLVER_METHODS:
+            self.method_var.set(session["method"])
+            self.select_method()
+        self.workers_var.set(min(session.get("workers", 1), os.cpu_count() or 1))
+        self.incremental_var.set(session.get("incremental", True))
+        self.target_values = list(session.get("target_values", []))
+        self.last_generation = None
+        self.generated_results = []
+        
+        self.build_form()
+        if not self.read_form(require_students="roster_targets" not in session):
+            return
+        if "roster_targets" in session:
+            self.roster_names = session.get("roster_names")
+            self.roster_targets = session["roster_targets"].tolist()
+            self.roster_file = session.get("roster_file") or "Imported roster"
+            self.num_students = len(self.roster_targets)
+            self.build_roster_summary(self.roster_file)
+        else:
+            self.build_targets()
+        
+        if "results" in session:
+            self.generation_config = session.get("config")
+            self.last_generation = (session["generation_targets"].tolist(), session["results"])
+            self.generated_results = session["results"]
+            self.show_results(self.generated_results)
+    
+    def close(self):
+        """Autosave, then quit"""
+        self.autosave()
+        self.root.destroy()
+    
     def run(self):
         """Start the application"""
+        # Load numpy/openpyxl in the background once the window is up, so the first
+        # generate or export doesn't pay for the import
+        self.root.after(1000, lambda: threading.Thread(target=warm_heavy_imports, daemon=True).start())
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         self.root.mainloop()
 
 # ================== Launch Application ==================
@@ -0,0 +1,76 @@
+"""Cold-start import budget for the GUI.
+
+Runs `python -X importtime -c "import autoGrader"` in fresh interpreters and fails
+(exit code 1) when the median import time goes over the budget, or when any of the
+heavy export/solver modules gets imported at start-up instead of on first use.
+
+    python benchmarks/import_budget.py --budget-ms 250
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from grading import HEAVY_MODULES
+
+# pandas used to be imported at start-up; keep it out for good
+FORBIDDEN_AT_STARTUP = HEAVY_MODULES + ("pandas",)
+
+
+def measure(module):
+    """Import module in a fresh interpreter; returns (cumulative microseconds, imported module names)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+
+    total, imported = None, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        imported.add(name.split(".")[0])
+        if name == module and cumulative.strip().isdigit():
+            total = int(cumulative)
+    return total, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="autoGrader")
+    parser.add_argument("--budget-ms", type=float, default=250.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    timings, imported = [], set()
+    for _ in range(args.runs):
+        total, names = measure(args.module)
+        timings.append(total / 1000)
+        imported |= names
+
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.1f} ms over {args.runs} runs "
+          f"(min {min(timings):.1f}, max {max(timings):.1f}), budget {args.budget_ms:.0f} ms")
+
+    failed = False
+    eager = sorted(set(FORBIDDEN_AT_STARTUP) & imported)
+    if eager:
+        print(f"FAIL: imported at start-up: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: over budget by {median - args.budget_ms:.1f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
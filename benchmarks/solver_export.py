@@ -0,0 +1,211 @@
+"""Solver and exporter benchmarks; runs without a display.
+
+Sweeps one input dimension at a time around a base case (subject, activity counts,
+perfect-score size, tolerance and class size) for each solver method, then times the
+workbook writer on large synthetic classes. Everything is written to a JSON file so
+runs of different backends can be compared:
+
+    python benchmarks/solver_export.py -o bench.json
+    python benchmarks/solver_export.py -o new.json --baseline bench.json
+
+With --baseline the run exits 1 when any case got slower than --max-slowdown times
+the baseline, or solved fewer students.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from grading import subject_weights, find_combination, solve_class, write_excel_file
+
+BASE_CASE = {
+    "subject": "Math",
+    "counts": (5, 3, 1),
+    "perfect": 50,
+    "tolerance": 0.01,
+    "students": 40,
+}
+SWEEPS = {
+    "subject": list(subject_weights),
+    "counts": [(3, 2, 1), (8, 4, 1), (15, 8, 2)],
+    "perfect": [10, 100, 500],
+    "tolerance": [0.001, 0.1, 0.5],
+    "students": [10, 200],
+}
+EXPORT_SIZES = [1000, 10000]
+
+
+def sweep_cases():
+    """The base case plus every single-dimension variation of it"""
+    cases = [dict(BASE_CASE)]
+    for dimension, values in SWEEPS.items():
+        for value in values:
+            if value != BASE_CASE[dimension]:
+                cases.append(dict(BASE_CASE, **{dimension: value}))
+    return cases
+
+
+def case_config(case):
+    weights = subject_weights[case["subject"]]
+    w_count, p_count, a_count = case["counts"]
+    return {
+        "w_perfect": [case["perfect"]] * w_count,
+        "p_perfect": [case["perfect"]] * p_count,
+        "a_perfect": [case["perfect"]] * a_count,
+        "w_weight": weights["Written"],
+        "p_weight": weights["Performance"],
+        "a_weight": weights["Assessment"],
+    }
+
+
+def case_key(case):
+    counts = "x".join(map(str, case["counts"]))
+    return f"{case['method']}|{case['subject']}|{counts}|{case['perfect']}|{case['tolerance']}|{case['students']}"
+
+
+def bench_solver(case, max_attempts, seed):
+    """Solve one synthetic class student by student and collect per-student figures"""
+    config = case_config(case)
+    rng = random.Random(seed)
+    random.seed(seed)
+    targets = [round(rng.uniform(70, 98), 2) for _ in range(case["students"])]
+
+    solved, attempts = 0, 0
+    start = time.perf_counter()
+    for target in targets:
+        stats = {}
+        result = find_combination(
+            config["w_perfect"], config["p_perfect"], config["a_perfect"],
+            config["w_weight"], config["p_weight"], config["a_weight"], target,
+            tolerance=case["tolerance"], max_attempts=max_attempts, method=case["method"], stats=stats
+        )
+        attempts += stats.get("attempts", 0)
+        solved += result is not None
+    elapsed = time.perf_counter() - start
+
+    return dict(
+        case,
+        counts=list(case["counts"]),
+        key=case_key(case),
+        success_rate=solved / len(targets),
+        attempts_per_success=attempts / solved if solved else None,
+        ms_per_student=elapsed * 1000 / len(targets),
+    )
+
+
+def synthetic_results(config, students, seed):
+    """A class of solved students without spending solver time on them"""
+    rng = random.Random(seed)
+    targets = sorted({round(rng.uniform(75, 95), 1) for _ in range(50)})
+    pool = [r for r in solve_class(targets, config) if "Error" not in r]
+    return [pool[i % len(pool)] for i in range(students)]
+
+
+def bench_export(students, seed):
+    config = case_config(BASE_CASE)
+    results = synthetic_results(config, students, seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.xlsx")
+
+        start = time.perf_counter()
+        write_excel_file(path, iter(results), BASE_CASE["subject"], *config.values())
+        elapsed = time.perf_counter() - start
+
+        # Separate run: tracemalloc slows the writer down too much to time it at the same time
+        tracemalloc.start()
+        write_excel_file(path, iter(results), BASE_CASE["subject"], *config.values())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "key": f"export|{students}",
+        "students": students,
+        "seconds_per_1000": elapsed * 1000 / students,
+        "peak_mb_per_1000": peak / 2 ** 20 * 1000 / students,
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def compare(report, baseline, max_slowdown):
+    """Messages for every case that regressed against the baseline report"""
+    old = {row["key"]: row for row in baseline.get("solver", []) + baseline.get("export", [])}
+    problems = []
+    for row in report["solver"]:
+        before = old.get(row["key"])
+        if before is None:
+            continue
+        if row["success_rate"] < before["success_rate"]:
+            problems.append(f"{row['key']}: success rate {before['success_rate']:.2f} -> {row['success_rate']:.2f}")
+        if row["ms_per_student"] > before["ms_per_student"] * max_slowdown:
+            problems.append(f"{row['key']}: {before['ms_per_student']:.2f} -> {row['ms_per_student']:.2f} ms/student")
+    for row in report["export"]:
+        before = old.get(row["key"])
+        if before is not None and row["seconds_per_1000"] > before["seconds_per_1000"] * max_slowdown:
+            problems.append(
+                f"{row['key']}: {before['seconds_per_1000']:.3f} -> {row['seconds_per_1000']:.3f} s/1000 students"
+            )
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the solver methods and the Excel exporter.")
+    parser.add_argument("-o", "--output", default="bench_output.json")
+    parser.add_argument("--methods", default="exact,numpy,random", help="comma-separated solver methods")
+    parser.add_argument("--max-attempts", type=int, default=100000)
+    parser.add_argument("--export-sizes", default=",".join(map(str, EXPORT_SIZES)))
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--baseline", help="earlier JSON report to check for regressions")
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "max_attempts": args.max_attempts,
+            "seed": args.seed,
+        },
+        "solver": [],
+        "export": [],
+    }
+
+    for method in args.methods.split(","):
+        for case in sweep_cases():
+            row = bench_solver(dict(case, method=method), args.max_attempts, args.seed)
+            report["solver"].append(row)
+            attempts = row["attempts_per_success"]
+            attempts = "-" if attempts is None else str(round(attempts))
+            print(f"{row['key']:<45} success {row['success_rate']:6.1%}  "
+                  f"attempts/success {attempts:>8}  "
+                  f"{row['ms_per_student']:9.2f} ms/student")
+
+    for students in map(int, filter(None, args.export_sizes.split(","))):
+        row = bench_export(students, args.seed)
+        report["export"].append(row)
+        print(f"{row['key']:<45} {row['seconds_per_1000']:.3f} s and {row['peak_mb_per_1000']:.2f} MB peak per 1000 students")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.max_slowdown)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
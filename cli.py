@@ -0,0 +1,317 @@
+"""Headless batch mode: solve a job file and write the workbook without any display.
+
+    python cli.py job.json -o grades.xlsx
+
+or grade a class record of real scores, kept in the same sheet layout, in bulk:
+
+    python cli.py --grade-record record.xlsx -o completed.xlsx
+
+A job file is JSON describing one sheet, or a "sheets" list of them. Keys set at the
+top level are defaults for every sheet:
+
+    {
+        "subject": "Math",
+        "section": "7-A",
+        "w_perfect": [20, 30, 25], "p_perfect": [50, 50], "a_perfect": [60],
+        "targets": [85, 90, {"name": "Ana Cruz", "target": 88.5}]
+    }
+
+Weights default to subject_weights[subject] and can be overridden with w_weight,
+p_weight and a_weight. Instead of targets a sheet may name a "roster" CSV/XLSX file,
+relative to the job file. tolerance, method, seed and constraints (realism limits such as
+{"floor": 50, "spread": 20, "deviation": 15}; see grading.CONSTRAINT_KEYS) are passed to
+the solver. With "transmuted": true the targets are transmuted grades (60-100) and any
+initial grade in the matching band of the transmutation table is accepted. With
+"distinct": true, students sharing a target get rows at least "min_difference" points
+apart. "class_budget_ms" and "student_budget_ms" cap the solve time of a sheet and of
+each student; a student who runs out of time gets the closest row found instead of an
+error (see grading.solve_class).
+"""
+import argparse
+import json
+import os
+import sys
+
+from grading import (
+    subject_weights, read_roster, solve_class, solve_class_parallel, write_excel_workbook,
+    cprofile_hook, write_diagnostics_json, ResultStore, grade_class_record, SolutionCache,
+    SOLVER_METHODS, CONSTRAINT_KEYS, COMPONENT_KEYS, activity_bounds, component_spreads, target_window
+)
+
+EXIT_OK = 0
+EXIT_UNSOLVED = 1  # workbook written, but some students have no matching combination
+EXIT_BAD_JOB = 2
+EXIT_WRITE_FAILED = 3
+
+SOLVER_KEYS = (
+    "tolerance", "max_attempts", "method", "seed", "constraints", "transmuted", "distinct", "min_difference",
+    "student_budget_ms", "class_budget_ms",
+)
+
+
+class JobError(Exception):
+    """The job file is missing, malformed or describes an impossible setup"""
+
+
+def _is_number(value, whole=False):
+    """True for an int or float (an int when whole), but not for a bool"""
+    return isinstance(value, int if whole else (int, float)) and not isinstance(value, bool)
+
+
+def _check_solver_settings(sheet, subject):
+    """Raise JobError for any solver setting the solver would choke on"""
+    for key in ("tolerance", "min_difference", "student_budget_ms", "class_budget_ms"):
+        if key in sheet and not (_is_number(sheet[key]) and sheet[key] >= 0):
+            raise JobError(f"{subject}: {key} must be a number of at least 0.")
+    if "max_attempts" in sheet and not (_is_number(sheet["max_attempts"], whole=True) and sheet["max_attempts"] > 0):
+        raise JobError(f"{subject}: max_attempts must be a whole number above 0.")
+    if sheet.get("method", "exact") not in SOLVER_METHODS:
+        raise JobError(f"{subject}: method must be one of {', '.join(SOLVER_METHODS)}.")
+    if sheet.get("seed") is not None and not (_is_number(sheet["seed"], whole=True) and sheet["seed"] >= 0):
+        raise JobError(f"{subject}: seed must be a whole number of at least 0.")
+    for key in ("transmuted", "distinct"):
+        if key in sheet and not isinstance(sheet[key], bool):
+            raise JobError(f"{subject}: {key} must be true or false.")
+
+    constraints = sheet.get("constraints")
+    if constraints is None:
+        return
+    if not isinstance(constraints, dict) or not set(constraints) <= set(CONSTRAINT_KEYS):
+        raise JobError(f"{subject}: constraints must be an object with any of {', '.join(CONSTRAINT_KEYS)}.")
+    for name, value in constraints.items():
+        if isinstance(value, dict) and not set(value) <= set(COMPONENT_KEYS):
+            raise JobError(f"{subject}: constraint {name} can only be given for {', '.join(COMPONENT_KEYS)}.")
+        values = value.values() if isinstance(value, dict) else [value]
+        values = [v for item in values for v in (item if isinstance(item, (list, tuple)) else [item])]
+        if not all(v is None or _is_number(v) for v in values):
+            raise JobError(f"{subject}: constraint {name} must be given in numbers.")
+    try:
+        # A dry run catches per-activity lists of the wrong length
+        activity_bounds([sheet["w_perfect"], sheet["p_perfect"], sheet["a_perfect"]], 100, constraints)
+        component_spreads(constraints)
+    except ValueError as e:
+        raise JobError(f"{subject}: {e}")
+
+
+def _sheet_from_job(job, base_dir):
+    """Turn one sheet description into a solver config plus targets and names"""
+    subject = job.get("subject")
+    if not subject or not isinstance(subject, str):
+        raise JobError("Every sheet needs a subject name.")
+    sheet = {"subject": subject, "section": job.get("section")}
+
+    weights = subject_weights.get(subject, {})
+    for key, weight_name in (("w_weight", "Written"), ("p_weight", "Performance"), ("a_weight", "Assessment")):
+        sheet[key] = job.get(key, weights.get(weight_name))
+        if sheet[key] is None:
+            raise JobError(f"{subject}: no {key} given and the subject has no default weights.")
+        if not (_is_number(sheet[key]) and sheet[key] >= 0):
+            raise JobError(f"{subject}: {key} must be a number of at least 0.")
+
+    for key in ("w_perfect", "p_perfect", "a_perfect"):
+        perfect = job.get(key)
+        if not isinstance(perfect, list) or not all(_is_number(p, whole=True) and p >= 0 for p in perfect):
+            raise JobError(f"{subject}: {key} must be a list of whole-number perfect scores.")
+        sheet[key] = perfect
+
+    for key in SOLVER_KEYS:
+        if key in job:
+            sheet[key] = job[key]
+    _check_solver_settings(sheet, subject)
+
+    if "roster" in job:
+        if base_dir is None:
+            raise JobError(f"{subject}: roster files are not accepted here; list the targets instead.")
+        if not isinstance(job["roster"], str):
+            raise JobError(f"{subject}: roster must be a file name.")
+        try:
+            names, targets = read_roster(os.path.join(base_dir, job["roster"]))
+        except (OSError, ValueError) as e:
+            raise JobError(f"{subject}: {e}")
+    else:
+        names, targets = [], []
+        if not isinstance(job.get("targets", []), list):
+            raise JobError(f"{subject}: targets must be a list.")
+        for item in job.get("targets", []):
+            if isinstance(item, dict):
+                names.append(str(item.get("name", "")))
+                item = item.get("target")
+            else:
+                names.append(None)
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                target = float(item)
+            except (TypeError, ValueError):
+                raise JobError(f"{subject}: target {item!r} is not a number.")
+            # JSON allows NaN and Infinity, which no solver can aim at
+            if not 0 <= target <= 100:
+                raise JobError(f"{subject}: target {item!r} must be a number from 0 to 100.")
+            targets.append(target)
+        if not any(names):
+            names = None
+    if not targets:
+        raise JobError(f"{subject}: the sheet has no targets.")
+    if sheet.get("transmuted"):
+        for target in set(targets):
+            try:
+                target_window(target, sheet)
+            except ValueError as e:
+                raise JobError(f"{subject}: {e}")
+
+    sheet["targets"] = targets
+    sheet["names"] = names
+    return sheet
+
+
+def load_job(path):
+    """Read a job file into a list of sheets"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            job = json.load(f)
+    except (OSError, ValueError) as e:
+        raise JobError(f"Can't read job file: {e}")
+    return sheets_from_job(job, os.path.dirname(os.path.abspath(path)))
+
+
+def sheets_from_job(job, base_dir=None):
+    """Turn a parsed job into a list of sheets; roster files are read relative to base_dir
+
+    Without a base_dir (jobs that didn't come from a file) roster files are refused.
+    """
+    if not isinstance(job, dict):
+        raise JobError("The job must be a JSON object.")
+    sheets = job.get("sheets", [{}])
+    if not isinstance(sheets, list) or not all(isinstance(sheet, dict) for sheet in sheets):
+        raise JobError("\"sheets\" must be a list of objects.")
+    if not sheets:
+        raise JobError("\"sheets\" must list at least one sheet.")
+    defaults = {key: value for key, value in job.items() if key != "sheets"}
+    parsed = []
+    for number, sheet in enumerate(sheets, 1):
+        try:
+            parsed.append(_sheet_from_job({**defaults, **sheet}, base_dir))
+        except (TypeError, ValueError, KeyError, AttributeError) as e:
+            # Whatever the checks above didn't foresee is still a bad job, not a crash
+            raise JobError(f"Sheet {number} is invalid: {e}")
+    return parsed
+
+
+def solve_sheets(sheets, workers=1, hook=None, cache=None):
+    """Solve every sheet in place, adding its results; returns the number of unsolved students
+
+    hook is passed on to solve_class, so it only sees solves done in this process. An
+    optional SolutionCache serves and keeps the rows of the sampling methods.
+    """
+    unsolved = 0
+    for sheet in sheets:
+        if workers > 1:
+            results = solve_class_parallel(sheet["targets"], sheet, workers, cache=cache)
+        else:
+            results = solve_class(sheet["targets"], sheet, cache=cache, hook=hook)
+        results = ResultStore.from_results(results, sheet)
+        if sheet["names"]:
+            results.set_names(sheet["names"])
+        sheet["results"] = results
+        unsolved += results.failures
+    return unsolved
+
+
+def grade_record(path, output, quiet=False):
+    """--grade-record: fill in the grades of every sheet of a class record"""
+    try:
+        summaries = grade_class_record(path, output)
+    except ImportError:
+        print("error: numpy and openpyxl are required to grade records (pip install numpy openpyxl)", file=sys.stderr)
+        return EXIT_WRITE_FAILED
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_BAD_JOB
+    problems = 0
+    for summary in summaries:
+        errors = summary["errors"]
+        problems += len(errors)
+        if not quiet:
+            print(f"{summary['title']}: {summary['students'] - len(errors)}/{summary['students']} students graded")
+        for row, message in errors.items():
+            print(f"warning: {summary['title']} row {row}: {message}", file=sys.stderr)
+    if not quiet:
+        print(f"Wrote {output}")
+    return EXIT_UNSOLVED if problems else EXIT_OK
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate grade sheets from a job file without the GUI.")
+    parser.add_argument("job", nargs="?", help="JSON job file")
+    parser.add_argument("-o", "--output", required=True, help="where to write the .xlsx workbook")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes for solving (default 1)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors")
+    parser.add_argument("--diagnostics", metavar="JSON", help="also write per-student solver telemetry to this file")
+    parser.add_argument("--diagnostics-sheet", action="store_true",
+                        help="add a solver telemetry sheet after every grade sheet")
+    parser.add_argument("--profile", metavar="PROF", help="run the solver under cProfile and dump the stats here")
+    parser.add_argument("--cache", metavar="SQLITE",
+                        help="keep the rows of the numpy and random methods in this file and reuse them on later runs")
+    parser.add_argument("--grade-record", metavar="XLSX",
+                        help="instead of solving a job, compute the grades of a record of real scores")
+    args = parser.parse_args(argv)
+
+    if args.grade_record:
+        return grade_record(args.grade_record, args.output, args.quiet)
+    if not args.job:
+        parser.error("a job file or --grade-record is required")
+
+    try:
+        sheets = load_job(args.job)
+    except JobError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_BAD_JOB
+
+    profile = None
+    if args.profile:
+        if args.workers > 1:
+            print("warning: --profile only covers solving in this process; use --workers 1", file=sys.stderr)
+        import cProfile
+        profile = cProfile.Profile()
+    cache = SolutionCache(args.cache) if args.cache else None
+    try:
+        unsolved = solve_sheets(sheets, args.workers, cprofile_hook(profile) if profile else None, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    if profile is not None:
+        profile.dump_stats(args.profile)
+    for sheet in sheets:
+        sheet["diagnostics"] = args.diagnostics_sheet
+
+    try:
+        write_excel_workbook(args.output, sheets)
+    except ImportError:
+        print("error: openpyxl is required to write workbooks (pip install openpyxl)", file=sys.stderr)
+        return EXIT_WRITE_FAILED
+    except OSError as e:
+        print(f"error: can't write {args.output}: {e}", file=sys.stderr)
+        return EXIT_WRITE_FAILED
+    if args.diagnostics:
+        try:
+            write_diagnostics_json(args.diagnostics, [r for sheet in sheets for r in sheet["results"]])
+        except OSError as e:
+            print(f"error: can't write {args.diagnostics}: {e}", file=sys.stderr)
+            return EXIT_WRITE_FAILED
+
+    if not args.quiet:
+        for sheet in sheets:
+            failed = sheet["results"].failures
+            approximate = sheet["results"].approximations
+            label = f"{sheet['section']} {sheet['subject']}" if sheet["section"] else sheet["subject"]
+            print(f"{label}: {len(sheet['results']) - failed}/{len(sheet['results'])} students solved"
+                  + (f", {approximate} of them only approximately" if approximate else ""))
+        print(f"Wrote {args.output}")
+    if unsolved:
+        print(f"warning: {unsolved} student(s) have no matching combination", file=sys.stderr)
+        return EXIT_UNSOLVED
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
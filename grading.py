@@ -0,0 +1,2203 @@
+"""Grade solving, roster import and Excel export. Nothing here needs a display."""
+import random
+import math
+import copy
+import itertools
+import os
+import threading
+import sqlite3
+import csv
+import json
+import struct
+import sys
+import zlib
+from collections import OrderedDict
+from array import array
+import time
+
+# Modules only needed once the user generates or exports; importing them costs seconds on slow laptops
+HEAVY_MODULES = ("numpy", "openpyxl")
+
+def warm_heavy_imports():
+    """Import the solver/export stack ahead of time, e.g. from a background thread after start-up"""
+    for name in HEAVY_MODULES:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+# ================== Subject-specific percentage weights ==================
+subject_weights = {
+    "Math": {"Written": 40, "Performance": 40, "Assessment": 20},
+    "English": {"Written": 30, "Performance": 50, "Assessment": 20},
+    "Science": {"Written": 35, "Performance": 45, "Assessment": 20},
+    "Filipino": {"Written": 25, "Performance": 50, "Assessment": 25},
+    "Araling Panlipunan": {"Written": 30, "Performance": 50, "Assessment": 20},
+}
+
+# ================== Score Constraints ==================
+# Optional realism limits, all in percent of an activity's perfect score:
+#   floor      every activity scores at least this much
+#   spread     the activities of one component are at most this many points apart
+#   deviation  every activity is at most this many points away from the target grade
+# Each value is a number for every component or a dict keyed by "w", "p" and "a";
+# floor and deviation may also give a list with one value per activity.
+CONSTRAINT_KEYS = ("floor", "spread", "deviation")
+COMPONENT_KEYS = ("w", "p", "a")
+
+def _constraint_values(constraints, name, component, count):
+    """Per-activity values of one constraint for one component; None means no limit"""
+    value = (constraints or {}).get(name)
+    if isinstance(value, dict):
+        value = value.get(component)
+    if isinstance(value, (list, tuple)):
+        if len(value) != count:
+            raise ValueError(f"{name} for {component} needs {count} values, got {len(value)}.")
+        return list(value)
+    return [value] * count
+
+def activity_bounds(perfects, target_grade, constraints):
+    """Lowest and highest allowed score of every activity, as (low, high) lists per component"""
+    eps = 1e-9
+    bounds = []
+    for component, perfect in zip(COMPONENT_KEYS, perfects):
+        floors = _constraint_values(constraints, "floor", component, len(perfect))
+        deviations = _constraint_values(constraints, "deviation", component, len(perfect))
+        low, high = [], []
+        for p, floor, deviation in zip(perfect, floors, deviations):
+            lowest = max(floor or 0, target_grade - deviation if deviation is not None else 0)
+            highest = min(100, target_grade + deviation) if deviation is not None else 100
+            low.append(min(max(math.ceil(lowest * p / 100 - eps), 0), p))
+            high.append(max(min(math.floor(highest * p / 100 + eps), p), 0))
+        bounds.append((low, high))
+    return bounds
+
+def component_spreads(constraints):
+    """The spread limit of each component, None where there is none"""
+    return [_constraint_values(constraints, "spread", component, 1)[0] for component in COMPONENT_KEYS]
+
+def within_spread(scores, perfect, spread):
+    """True when the activity percentages are at most spread points apart"""
+    if spread is None:
+        return True
+    percents = [s / p * 100 for s, p in zip(scores, perfect) if p > 0]
+    return not percents or max(percents) - min(percents) <= spread + 1e-9
+
+def bounded_split(total, perfect, low, high, spread=None):
+    """Split total across activities as evenly (in percent) as the bounds allow.
+
+    When the most even split is wider than spread, the level windows are searched
+    instead (see _spread_split). Returns None when no split within low/high and spread
+    exists.
+    """
+    if not sum(low) <= total <= sum(high):
+        return None
+    denom = sum(perfect)
+    if denom == 0:
+        return [0] * len(perfect)
+    scores = [min(max(total * p // denom, l), h) for p, l, h in zip(perfect, low, high)]
+    remaining = total - sum(scores)
+    # Hand points to the activity furthest behind (or take them from the one furthest ahead)
+    while remaining > 0:
+        i = min((i for i in range(len(perfect)) if scores[i] < high[i]), key=lambda i: (scores[i] + 1) / perfect[i])
+        scores[i] += 1
+        remaining -= 1
+    while remaining < 0:
+        i = max((i for i in range(len(perfect)) if scores[i] > low[i]), key=lambda i: (scores[i] - 1) / perfect[i])
+        scores[i] -= 1
+        remaining += 1
+    if within_spread(scores, perfect, spread):
+        return scores
+    return _spread_split(total, perfect, low, high, spread)
+
+def _spread_levels(perfect, low, high, spread, even=None):
+    """Candidate levels (lowest activity percentage) of a row within spread, nearest even first.
+
+    A row within spread has every activity between its lowest percentage and that plus
+    spread, so those percentages are the only levels worth trying. With even (the
+    component's percentage) given, only levels whose window can contain it are kept.
+    """
+    active = [i for i, p in enumerate(perfect) if p > 0]
+    extra = [] if even is None else [even]
+    level_low = max([low[i] / perfect[i] * 100 for i in active] + extra) - spread
+    level_high = min([high[i] / perfect[i] * 100 for i in active] + extra)
+    levels = {
+        s * 100 / perfect[i] for i in active for s in range(low[i], high[i] + 1)
+        if level_low - 1e-9 <= s * 100 / perfect[i] <= level_high + 1e-9
+    }
+    return sorted(levels, key=lambda level: abs(level - even)) if even is not None else sorted(levels)
+
+def _level_window(level, perfect, low, high, spread):
+    """(low, high) scores every activity may take at this level; None when one has no room"""
+    window_low = [max(l, math.ceil(level * p / 100 - 1e-9)) for p, l in zip(perfect, low)]
+    window_high = [min(h, math.floor((level + spread) * p / 100 + 1e-9)) for p, h in zip(perfect, high)]
+    if any(l > h for l, h in zip(window_low, window_high)):
+        return None
+    return window_low, window_high
+
+def _spread_split(total, perfect, low, high, spread):
+    """Split total within spread by trying every level window, as sample_scores draws them.
+
+    Levels closest to the even one come first; the even percentage is an average of the
+    activities', so it always lies inside the window of a valid row.
+    """
+    for level in _spread_levels(perfect, low, high, spread, total / sum(perfect) * 100):
+        window = _level_window(level, perfect, low, high, spread)
+        if window is None:
+            continue
+        scores = bounded_split(total, perfect, *window)
+        if scores is not None and within_spread(scores, perfect, spread):
+            return scores
+    return None
+
+def spread_totals(perfect, low, high, spread):
+    """Every component total bounded_split can split, as sorted, disjoint (first, last) runs"""
+    if spread is None or not any(perfect):
+        return [(sum(low), sum(high))] if sum(low) <= sum(high) else []
+    # Each level window allows every total between its two sums
+    runs = sorted(
+        (sum(window[0]), sum(window[1]))
+        for window in (_level_window(level, perfect, low, high, spread)
+                       for level in _spread_levels(perfect, low, high, spread))
+        if window is not None
+    )
+    merged = []
+    for first, last in runs:
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+def sample_scores(perfect, low, high, spread=None, rng=random):
+    """Random scores for one component, drawn straight from the allowed ranges.
+
+    With a spread the component first picks a level, then every activity is drawn within
+    spread points above it, so rows come out realistic without rejecting any.
+    """
+    if spread is None:
+        return [rng.randint(l, h) for l, h in zip(low, high)]
+    active = [i for i, p in enumerate(perfect) if p > 0]
+    if not active:
+        return list(low)
+    level_low = max(low[i] / perfect[i] * 100 for i in active) - spread
+    level_high = min(high[i] / perfect[i] * 100 for i in active)
+    level = rng.uniform(max(level_low, 0), max(level_high, level_low, 0))
+    scores = []
+    for p, l, h in zip(perfect, low, high):
+        window_low = max(l, math.ceil(level * p / 100 - 1e-9))
+        window_high = min(h, math.floor((level + spread) * p / 100 + 1e-9))
+        if window_low > window_high:
+            # The window holds no whole score; take the bound closest to it
+            window_low = window_high = min(max(round((level + spread / 2) * p / 100), l), h)
+        scores.append(rng.randint(window_low, window_high))
+    return scores
+
+def _bounds_conflict(bounds):
+    """True when some activity's floor is above its cap, so nothing can satisfy the constraints"""
+    return any(l > h for low, high in bounds for l, h in zip(low, high))
+
+def constrained(constraints):
+    """True when constraints actually limit anything"""
+    return any((constraints or {}).get(name) is not None for name in CONSTRAINT_KEYS)
+
+# ================== Grade Logic ==================
+def calculate_component_grade(scores, perfect_scores):
+    return (sum(scores) / sum(perfect_scores)) * 100 if sum(perfect_scores) > 0 else 0
+
+def split_total(total, perfect_scores):
+    """Spread a component total across its activities without going over any perfect score"""
+    denom = sum(perfect_scores)
+    if denom == 0:
+        return [0] * len(perfect_scores)
+    scores = [total * p // denom for p in perfect_scores]
+    remaining = total - sum(scores)
+    # Hand out the leftover points to the activities with the largest rounding loss
+    order = sorted(range(len(perfect_scores)), key=lambda i: (total * perfect_scores[i]) % denom, reverse=True)
+    for i in order:
+        if remaining == 0:
+            break
+        if scores[i] < perfect_scores[i]:
+            scores[i] += 1
+            remaining -= 1
+    return scores
+
+def _outward(low, high, center):
+    """Yield the integers in [low, high] starting at center and moving outward"""
+    if low > high:
+        return
+    center = min(max(int(round(center)), low), high)
+    yield center
+    for offset in range(1, high - low + 1):
+        if center + offset <= high:
+            yield center + offset
+        if center - offset >= low:
+            yield center - offset
+        if center + offset > high and center - offset < low:
+            return
+
+def _final_from_totals(totals, perfect_totals, weights):
+    grades = [calculate_component_grade([t], [p]) for t, p in zip(totals, perfect_totals)]
+    return grades, sum(g * w for g, w in zip(grades, weights)) / 100
+
+def _inner_period(weight_j, total_j, weight_k, total_k, tolerance):
+    """Number of y values worth trying before the grades reachable with (y, z) start repeating"""
+    from fractions import Fraction
+
+    if total_j == 0 or total_k == 0 or weight_j == 0 or weight_k == 0:
+        return None
+    step_j, step_k = Fraction(weight_j) / total_j, Fraction(weight_k) / total_k
+    common = Fraction(
+        math.gcd(step_j.numerator * step_k.denominator, step_k.numerator * step_j.denominator),
+        step_j.denominator * step_k.denominator
+    )
+    period = int(step_k / common)
+    # Leave room for the y values at either end of the range where z runs into its bounds
+    margin = math.ceil(2 * tolerance / float(step_j)) + 1
+    return period + 2 * margin
+
+def _outward_runs(runs, low, high, center):
+    """Like _outward, but only yields the integers of [low, high] inside runs (see spread_totals)"""
+    members = [range(max(low, first), min(high, last) + 1) for first, last in runs if first <= high and last >= low]
+    start = int(round(center))
+    up = itertools.chain.from_iterable(range(max(r.start, start), r.stop) for r in members if r.stop > start)
+    down = itertools.chain.from_iterable(
+        range(min(r.stop, start) - 1, r.start - 1, -1) for r in reversed(members) if r.start < start
+    )
+    above, below = next(up, None), next(down, None)
+    while above is not None or below is not None:
+        if below is None or (above is not None and above - center <= center - below):
+            yield above
+            above = next(up, None)
+        else:
+            yield below
+            below = next(down, None)
+
+def _component_runs(plan, bounds):
+    """spread_totals of every component for these bounds, cached on the plan"""
+    runs = []
+    for component, ((low, high), perfect, spread) in enumerate(zip(bounds, plan["perfects"], plan["spreads"])):
+        if spread is None:
+            runs.append([(sum(low), sum(high))])
+            continue
+        key = (component, tuple(low), tuple(high))
+        if key not in plan["runs"]:
+            plan["runs"][key] = spread_totals(perfect, low, high, spread)
+        runs.append(plan["runs"][key])
+    return runs
+
+def _exact_plan(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, tolerance=0.01, constraints=None):
+    """Precompute everything the exact search needs that does not depend on the target"""
+    perfects = [w_perfect, p_perfect, a_perfect]
+    perfect_totals = [sum(p) for p in perfects]
+    weights = [w_weight, p_weight, a_weight]
+    # How much one point of each component total moves the final grade
+    steps = [w / t if t > 0 else 0 for w, t in zip(weights, perfect_totals)]
+    # Walk the two smallest totals and solve the largest one in closed form
+    order = sorted(range(3), key=lambda c: perfect_totals[c])
+    j, k = order[1], order[2]
+    return {
+        "perfects": perfects,
+        "perfect_totals": perfect_totals,
+        "weights": weights,
+        "steps": steps,
+        "order": order,
+        "max_grade": sum(s * t for s, t in zip(steps, perfect_totals)),
+        "inner_limit": _inner_period(weights[j], perfect_totals[j], weights[k], perfect_totals[k], tolerance),
+        "tolerance": tolerance,
+        "constraints": constraints if constrained(constraints) else None,
+        "spreads": component_spreads(constraints),
+        # spread_totals per (component, bounds), shared by every target the plan solves
+        "runs": {},
+    }
+
+def _exact_hits(plan, target_grade, stats=None, deadline=None):
+    """Yield (totals, grades, final, bounds) for every component-total triple within tolerance.
+
+    Triples come nearest the target's own level first. stats is kept current at every
+    hit and once the search ends, including the closest triple seen ("best_totals").
+    The search stops early, with stats["timed_out"] set, once time.perf_counter()
+    passes deadline.
+    """
+    perfects, perfect_totals = plan["perfects"], plan["perfect_totals"]
+    weights, steps, tolerance = plan["weights"], plan["steps"], plan["tolerance"]
+    i, j, k = plan["order"]
+    lo, hi = target_grade - tolerance, target_grade + tolerance
+    eps = 1e-9
+
+    # Component totals the constraints allow; the whole range without any
+    if plan["constraints"] is not None:
+        bounds = activity_bounds(perfects, target_grade, plan["constraints"])
+    else:
+        bounds = [([0] * len(p), list(p)) for p in perfects]
+    # Under a spread only some totals can be split; the walks below skip the rest
+    runs = [] if _bounds_conflict(bounds) else _component_runs(plan, bounds)
+    if not all(runs):
+        if stats is not None:
+            stats["attempts"], stats["best_distance"] = 0, None
+        return
+    total_low = [r[0][0] for r in runs]
+    total_high = [r[-1][1] for r in runs]
+    min_grade = sum(s * t for s, t in zip(steps, total_low))
+    max_grade = sum(s * t for s, t in zip(steps, total_high))
+    # Gaps between the runs break the period the y walk relies on
+    gaps = any(len(r) > 1 for r in runs)
+    inner_limit = None if gaps else plan["inner_limit"]
+
+    def walk(component, low, high, center):
+        return _outward_runs(runs[component], low, high, center) if gaps else _outward(low, high, center)
+
+    if hi < min_grade or lo > max_grade:
+        if stats is not None:
+            stats["attempts"] = 0
+            stats["best_distance"] = float(max(min_grade - target_grade, target_grade - max_grade))
+            stats["best_totals"] = total_low if hi < min_grade else total_high
+        return
+
+    reach_k = steps[k] * total_high[k]
+    floor_k = steps[k] * total_low[k]
+    attempts = 0
+    best = math.inf
+    best_totals = None
+    walked = 0
+
+    def order_totals(x, y, z):
+        totals = [0, 0, 0]
+        totals[i], totals[j], totals[k] = x, y, z
+        return totals
+
+    for x in walk(i, total_low[i], total_high[i], target_grade * perfect_totals[i] / 100):
+        base_x = x * steps[i]
+        if steps[j] > 0:
+            y_low = max(total_low[j], math.ceil((lo - base_x - reach_k) / steps[j] - eps))
+            y_high = min(total_high[j], math.floor((hi - base_x - floor_k) / steps[j] + eps))
+        else:
+            y_low, y_high = total_low[j], total_low[j]
+        # y values one period apart reach the same grades, so there is no point walking further
+        for y in itertools.islice(walk(j, y_low, y_high, target_grade * perfect_totals[j] / 100), inner_limit):
+            walked += 1
+            if deadline is not None and walked % 64 == 0 and time.perf_counter() > deadline:
+                if stats is not None:
+                    stats["timed_out"] = True
+                    stats["attempts"] = attempts
+                    stats["best_distance"] = best if best < math.inf else None
+                    stats["best_totals"] = best_totals
+                return
+            base = base_x + y * steps[j]
+            if steps[k] > 0:
+                z_low = max(total_low[k], math.ceil((lo - base) / steps[k] - eps))
+                z_high = min(total_high[k], math.floor((hi - base) / steps[k] + eps))
+            else:
+                z_low, z_high = total_low[k], total_low[k]
+            if z_low > z_high and steps[k] > 0:
+                # Nothing fits between these bounds; note how close the nearest z gets
+                z_near = min(max(round((target_grade - base) / steps[k]), total_low[k]), total_high[k])
+                if gaps:
+                    z_near = next(walk(k, total_low[k], total_high[k], z_near))
+                distance = abs(base + z_near * steps[k] - target_grade)
+                if distance < best:
+                    best, best_totals = distance, order_totals(x, y, z_near)
+            z_center = target_grade * perfect_totals[k] / 100
+            z_walk = _outward_runs(runs[k], z_low, z_high, z_center) if gaps else _outward(z_low, z_high, z_center)
+            for z in z_walk:
+                totals = order_totals(x, y, z)
+                grades, final = _final_from_totals(totals, perfect_totals, weights)
+                attempts += 1
+                if abs(final - target_grade) < best:
+                    best, best_totals = abs(final - target_grade), totals
+                if abs(final - target_grade) <= tolerance:
+                    if stats is not None:
+                        stats["attempts"] = attempts
+                        stats["best_distance"] = best
+                        stats["best_totals"] = best_totals
+                    yield totals, grades, final, bounds
+    if stats is not None:
+        stats["attempts"] = attempts
+        stats["best_distance"] = best if best < math.inf else None
+        stats["best_totals"] = best_totals
+
+def _exact_result(plan, totals, bounds):
+    """Result for one component-total triple; None when it can't be split within the constraints"""
+    if plan["constraints"] is not None:
+        split = [
+            bounded_split(t, p, low, high, spread)
+            for t, p, (low, high), spread in zip(totals, plan["perfects"], bounds, plan["spreads"])
+        ]
+        if None in split:
+            return None
+    else:
+        split = [split_total(t, p) for t, p in zip(totals, plan["perfects"])]
+    grades, final = _final_from_totals(totals, plan["perfect_totals"], plan["weights"])
+    w_scores, p_scores, a_scores = split
+    return {
+        "Written Works": (w_scores, grades[0]),
+        "Performance Task": (p_scores, grades[1]),
+        "Quarterly Assessment": (a_scores, grades[2]),
+        "Final Grade": round(final, 2)
+    }
+
+def _solve_exact(plan, target_grade, stats=None, deadline=None, best_effort=False):
+    stats = {} if stats is None else stats
+    for totals, grades, final, bounds in _exact_hits(plan, target_grade, stats, deadline):
+        result = _exact_result(plan, totals, bounds)
+        if result is not None:
+            return result
+    if best_effort and stats.get("best_totals") is not None:
+        if plan["constraints"] is not None:
+            bounds = activity_bounds(plan["perfects"], target_grade, plan["constraints"])
+        else:
+            bounds = [([0] * len(p), list(p)) for p in plan["perfects"]]
+        result = _exact_result(plan, stats["best_totals"], bounds)
+        stats["approximate"] = result is not None
+        return result
+    return None
+
+def find_exact_combination(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, target_grade, tolerance=0.01,
+                           stats=None, constraints=None, deadline=None, best_effort=False):
+    """Search the component totals directly instead of sampling every activity.
+
+    The component grade only depends on the sum of its scores, so it is enough to find
+    three totals that hit the target and then split each one across its activities.
+    Constraints narrow the range of every total, and the split then keeps each activity
+    within its bounds.
+    """
+    plan = _exact_plan(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, tolerance, constraints)
+    return _solve_exact(plan, target_grade, stats, deadline, best_effort)
+
+def _scored_result(w_scores, p_scores, a_scores, w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight):
+    """Result dict for one row of activity scores, graded the plain-Python way"""
+    w_grade = calculate_component_grade(w_scores, w_perfect)
+    p_grade = calculate_component_grade(p_scores, p_perfect)
+    a_grade = calculate_component_grade(a_scores, a_perfect)
+    final = (w_grade * w_weight + p_grade * p_weight + a_grade * a_weight) / 100
+    return {
+        "Written Works": (w_scores, w_grade),
+        "Performance Task": (p_scores, p_grade),
+        "Quarterly Assessment": (a_scores, a_grade),
+        "Final Grade": round(final, 2)
+    }
+
+def _numpy_sample(np, rng, rows, perfects, bounds, spreads):
+    """A block of constrained score rows, drawn like sample_scores; returns (scores, ok mask)"""
+    blocks, ok = [], np.ones(rows, dtype=bool)
+    for perfect, (low, high), spread in zip(perfects, bounds, spreads):
+        perfect, low, high = (np.array(v, dtype=np.int64) for v in (perfect, low, high))
+        if spread is None or not (perfect > 0).any():
+            blocks.append(rng.integers(low, high + 1, size=(rows, len(perfect))))
+            continue
+        active = perfect > 0
+        level_low = max((low[active] / perfect[active] * 100).max() - spread, 0)
+        level_high = max((high[active] / perfect[active] * 100).min(), level_low)
+        level = rng.uniform(level_low, level_high, size=(rows, 1))
+        window_low = np.maximum(low, np.ceil(level * perfect / 100 - 1e-9)).astype(np.int64)
+        window_high = np.minimum(high, np.floor((level + spread) * perfect / 100 + 1e-9)).astype(np.int64)
+        empty = window_low > window_high
+        nearest = np.clip(np.rint((level + spread / 2) * perfect / 100), low, high).astype(np.int64)
+        window_low = np.where(empty, nearest, window_low)
+        window_high = np.where(empty, nearest, window_high)
+        scores = rng.integers(window_low, window_high + 1)
+        percents = scores[:, active] / perfect[active] * 100
+        ok &= percents.max(axis=1) - percents.min(axis=1) <= spread + 1e-9
+        blocks.append(scores)
+    return np.concatenate(blocks, axis=1), ok
+
+def find_numpy_combination(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, target_grade,
+                           tolerance=0.01, max_attempts=100000, block_size=4096, rng=None, stats=None,
+                           constraints=None, deadline=None, best_effort=False):
+    """Random sampling like the "random" method, but a whole block of candidates is scored at once"""
+    import numpy as np
+
+    if rng is None:
+        rng = np.random.default_rng()
+    perfects = [w_perfect, p_perfect, a_perfect]
+    if constrained(constraints):
+        limits = activity_bounds(perfects, target_grade, constraints)
+        spreads = component_spreads(constraints)
+        if _bounds_conflict(limits):
+            if stats is not None:
+                stats["attempts"], stats["best_distance"] = 0, None
+            return None
+    else:
+        limits = None
+    weights = np.array([w_weight, p_weight, a_weight], dtype=float)
+    perfect_totals = np.array([sum(p) for p in perfects], dtype=float)
+    high = np.array(w_perfect + p_perfect + a_perfect, dtype=np.int64) + 1
+    bounds = np.cumsum([0] + [len(p) for p in perfects])
+    safe_totals = np.where(perfect_totals > 0, perfect_totals, 1)
+
+    attempts = 0
+    best, best_scores = math.inf, None
+    timed_out = False
+    while attempts < max_attempts:
+        if deadline is not None and attempts and time.perf_counter() > deadline:
+            timed_out = True
+            break
+        rows = min(block_size, max_attempts - attempts)
+        attempts += rows
+        if limits is None:
+            scores, ok = rng.integers(0, high, size=(rows, len(high))), True
+        else:
+            scores, ok = _numpy_sample(np, rng, rows, perfects, limits, spreads)
+        sums = np.stack([scores[:, bounds[c]:bounds[c + 1]].sum(axis=1) for c in range(3)], axis=1)
+        grades = np.where(perfect_totals > 0, sums / safe_totals * 100, 0)
+        final = np.where(ok, grades @ weights / 100, np.inf)
+        nearest = int(np.argmin(np.abs(final - target_grade)))
+        if abs(final[nearest] - target_grade) < best:
+            best, best_scores = float(abs(final[nearest] - target_grade)), scores[nearest]
+
+        for row in np.flatnonzero(np.abs(final - target_grade) <= tolerance):
+            w_scores, p_scores, a_scores = [
+                scores[row, bounds[c]:bounds[c + 1]].tolist() for c in range(3)
+            ]
+            # Rescore the winning row in plain Python so the result matches the other methods exactly
+            w_grade = calculate_component_grade(w_scores, w_perfect)
+            p_grade = calculate_component_grade(p_scores, p_perfect)
+            a_grade = calculate_component_grade(a_scores, a_perfect)
+            row_final = (w_grade * w_weight + p_grade * p_weight + a_grade * a_weight) / 100
+            if abs(row_final - target_grade) <= tolerance:
+                if stats is not None:
+                    stats["attempts"] = int(attempts - rows + row + 1)
+                    stats["best_distance"] = abs(row_final - target_grade)
+                return _scored_result(w_scores, p_scores, a_scores, w_perfect, p_perfect, a_perfect,
+                                      w_weight, p_weight, a_weight)
+    if stats is not None:
+        stats["attempts"] = attempts
+        stats["best_distance"] = best if best < math.inf else None
+        if timed_out:
+            stats["timed_out"] = True
+    if best_effort and best_scores is not None:
+        if stats is not None:
+            stats["approximate"] = True
+        w_scores, p_scores, a_scores = [best_scores[bounds[c]:bounds[c + 1]].tolist() for c in range(3)]
+        return _scored_result(w_scores, p_scores, a_scores, w_perfect, p_perfect, a_perfect,
+                              w_weight, p_weight, a_weight)
+    return None
+
+SOLVER_METHODS = ("exact", "numpy", "random")
+
+def find_combination(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, target_grade, tolerance=0.01, max_attempts=100000, method="exact", stats=None, constraints=None,
+                     deadline=None, best_effort=False, rng=None):
+    """Find activity scores whose final grade is within tolerance of target_grade.
+
+    Pass a dict as stats to get back how many candidates the solver tried ("attempts")
+    and how close the nearest one came to the target ("best_distance"). constraints
+    limits the scores themselves (see CONSTRAINT_KEYS); every method draws or searches
+    only inside those limits instead of filtering afterwards.
+
+    deadline is a time.perf_counter() value after which the search gives up, setting
+    stats["timed_out"]. With best_effort, a search that finds nothing within tolerance
+    (out of time or attempts) returns the closest candidate it saw instead of None and
+    sets stats["approximate"]; its "Final Grade" is then the actual grade reached.
+
+    rng is the random.Random the "random" method draws from; the random module's own
+    shared generator when None.
+    """
+    if method == "exact":
+        return find_exact_combination(
+            w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, target_grade, tolerance, stats, constraints,
+            deadline, best_effort
+        )
+    if method == "numpy":
+        return find_numpy_combination(
+            w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, target_grade, tolerance, max_attempts,
+            stats=stats, constraints=constraints, deadline=deadline, best_effort=best_effort
+        )
+    if method != "random":
+        raise ValueError(f"Unknown solver method: {method}")
+
+    rng = rng or random
+    perfects = [w_perfect, p_perfect, a_perfect]
+    bounds = activity_bounds(perfects, target_grade, constraints) if constrained(constraints) else None
+    spreads = component_spreads(constraints)
+    if bounds is not None and _bounds_conflict(bounds):
+        if stats is not None:
+            stats["attempts"], stats["best_distance"] = 0, None
+        return None
+
+    best, best_scores = math.inf, None
+    attempt = 0
+    for attempt in range(1, max_attempts + 1):
+        if deadline is not None and attempt % 256 == 0 and time.perf_counter() > deadline:
+            if stats is not None:
+                stats["timed_out"] = True
+            break
+        if bounds is None:
+            w_scores = [rng.randint(0, p) for p in w_perfect]
+            p_scores = [rng.randint(0, p) for p in p_perfect]
+            a_scores = [rng.randint(0, p) for p in a_perfect]
+        else:
+            w_scores, p_scores, a_scores = [
+                sample_scores(perfect, low, high, spread, rng)
+                for perfect, (low, high), spread in zip(perfects, bounds, spreads)
+            ]
+            # A window too narrow for any whole score can still break the spread
+            if not all(within_spread(*row) for row in zip((w_scores, p_scores, a_scores), perfects, spreads)):
+                continue
+
+        w_grade = calculate_component_grade(w_scores, w_perfect)
+        p_grade = calculate_component_grade(p_scores, p_perfect)
+        a_grade = calculate_component_grade(a_scores, a_perfect)
+
+        final = (w_grade * w_weight + p_grade * p_weight + a_grade * a_weight) / 100
+        if abs(final - target_grade) < best:
+            best, best_scores = abs(final - target_grade), (w_scores, p_scores, a_scores)
+
+        if abs(final - target_grade) <= tolerance:
+            if stats is not None:
+                stats["attempts"] = attempt
+                stats["best_distance"] = best
+            return {
+                "Written Works": (w_scores, w_grade),
+                "Performance Task": (p_scores, p_grade),
+                "Quarterly Assessment": (a_scores, a_grade),
+                "Final Grade": round(final, 2)
+            }
+    if stats is not None:
+        stats["attempts"] = attempt
+        stats["best_distance"] = best if best < math.inf else None
+    if best_effort and best_scores is not None:
+        if stats is not None:
+            stats["approximate"] = True
+        return _scored_result(*best_scores, w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight)
+    return None
+
+def random_split(total, perfect, low, high, spread=None, rng=random):
+    """Like bounded_split, but with points moved around at random for a less uniform row.
+
+    Starts from the even split and shifts a few chunks of points between activities,
+    keeping every score within its bounds. Returns None when the result breaks spread.
+    """
+    scores = bounded_split(total, perfect, low, high)
+    if scores is None or len(scores) < 2:
+        return scores
+    for _ in range(2 * len(scores)):
+        give, take = rng.sample(range(len(scores)), 2)
+        # Chunks up to a fifth of the smaller activity keep rows close to the student's level
+        room = min(scores[give] - low[give], high[take] - scores[take],
+                   max(1, min(perfect[give], perfect[take]) // 5))
+        if room > 0:
+            amount = rng.randint(1, room)
+            scores[give] -= amount
+            scores[take] += amount
+    return scores if within_spread(scores, perfect, spread) else None
+
+def row_distance(a, b):
+    """Total absolute score difference between two results, activity by activity"""
+    return sum(
+        abs(x - y)
+        for component, _, _ in RESULT_COMPONENTS
+        for x, y in zip(a[component][0], b[component][0])
+    )
+
+def find_distinct_combinations(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, target_grade, count,
+                               min_difference=1, tolerance=0.01, constraints=None, rng=None, stats=None,
+                               max_hits=None, deadline=None):
+    """Up to count different results for one target from a single exact search.
+
+    Every two rows are at least min_difference points apart (see row_distance). Rows come
+    from different component-total triples as well as from different random splits of the
+    same triple, so even a target with few triples yields plenty of rows. Fewer than count
+    rows come back only when the search space really holds no more, or when the search
+    runs past deadline (a time.perf_counter() value).
+    """
+    rng = rng or random.Random()
+    plan = _exact_plan(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight, tolerance, constraints)
+    # Sample among many triples rather than only the ones nearest the target's level
+    hits = list(itertools.islice(_exact_hits(plan, target_grade, stats, deadline), max_hits or max(50, 20 * count)))
+    rng.shuffle(hits)
+
+    rows = []
+    if not hits:
+        return rows
+    for attempt in range(max(len(hits), 50 * count)):
+        totals, grades, final, bounds = hits[attempt % len(hits)]
+        limits = list(zip(totals, plan["perfects"], bounds, plan["spreads"]))
+        # The first pass takes each triple's even split, later passes shuffle points around
+        if attempt < len(hits):
+            split = [bounded_split(t, p, low, high, spread) for t, p, (low, high), spread in limits]
+        else:
+            split = [random_split(t, p, low, high, spread, rng) for t, p, (low, high), spread in limits]
+        if None in split:
+            continue
+        row = {
+            "Written Works": (split[0], grades[0]),
+            "Performance Task": (split[1], grades[1]),
+            "Quarterly Assessment": (split[2], grades[2]),
+            "Final Grade": round(final, 2)
+        }
+        if all(row_distance(row, other) >= min_difference for other in rows):
+            rows.append(row)
+            if len(rows) == count:
+                break
+    return rows
+
+# ================== Transmutation ==================
+# Standard initial-to-transmuted grade table: (lowest initial grade, transmuted grade).
+# Each band runs up to the next one's lower bound; only a perfect 100 transmutes to 100.
+TRANSMUTATION_TABLE = [
+    (100.0, 100), (98.40, 99), (96.80, 98), (95.20, 97), (93.60, 96), (92.00, 95),
+    (90.40, 94), (88.80, 93), (87.20, 92), (85.60, 91), (84.00, 90), (82.40, 89),
+    (80.80, 88), (79.20, 87), (77.60, 86), (76.00, 85), (74.40, 84), (72.80, 83),
+    (71.20, 82), (69.60, 81), (68.00, 80), (66.40, 79), (64.80, 78), (63.20, 77),
+    (61.60, 76), (60.00, 75), (56.00, 74), (52.00, 73), (48.00, 72), (44.00, 71),
+    (40.00, 70), (36.00, 69), (32.00, 68), (28.00, 67), (24.00, 66), (20.00, 65),
+    (16.00, 64), (12.00, 63), (8.00, 62), (4.00, 61), (0.0, 60),
+]
+
+# Inverse table: transmuted grade -> (low, high) initial grades, high excluded except for 100
+TRANSMUTED_INTERVALS = {
+    grade: (low, TRANSMUTATION_TABLE[i - 1][0] if i else 100.0)
+    for i, (low, grade) in enumerate(TRANSMUTATION_TABLE)
+}
+
+def transmute_many(initial_grades):
+    """transmute over a whole NumPy array of initial grades at once"""
+    import numpy as np
+
+    lows = np.array([low for low, _ in reversed(TRANSMUTATION_TABLE)])
+    grades = np.array([grade for _, grade in reversed(TRANSMUTATION_TABLE)])
+    values = np.asarray(initial_grades, dtype=float)
+    rounded = np.round(values, 2)
+    # np.round scales by 100 first and can settle a near-tie differently from round(); redo those
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    rounded[near_tie] = [round(value, 2) for value in values[near_tie].tolist()]
+    return grades[np.maximum(np.searchsorted(lows, rounded, side="right") - 1, 0)]
+
+def transmute(initial_grade):
+    """Transmuted grade for an initial grade"""
+    # Initial grades are reported to 2 decimals, so 98.399... already counts as 98.40
+    initial_grade = round(initial_grade, 2)
+    for low, grade in TRANSMUTATION_TABLE:
+        if initial_grade >= low:
+            return grade
+    return TRANSMUTATION_TABLE[-1][1]
+
+def target_window(target, config):
+    """(center, tolerance) of the initial grades that satisfy target.
+
+    With config["transmuted"] the target is a transmuted grade and the window is its whole
+    band of initial grades; otherwise it is target +/- the configured tolerance.
+    """
+    if not config.get("transmuted"):
+        return target, config.get("tolerance", 0.01)
+    if target not in TRANSMUTED_INTERVALS:
+        raise ValueError(f"{target} is not a transmuted grade (whole numbers from 60 to 100).")
+    low, high = TRANSMUTED_INTERVALS[target]
+    # transmute() rounds to 2 decimals first, which moves both ends down by half a cent;
+    # stay a hair inside them so float noise can't tip a grade into the next band
+    low = low - 0.005 + 1e-6
+    high = high if target == TRANSMUTATION_TABLE[0][1] else high - 0.005 - 1e-6
+    return (low + high) / 2, (high - low) / 2
+
+# ================== Achievable Grades ==================
+# Largest number of (x, y) pairs the index will store before giving up on indexing
+GRADE_INDEX_MAX_PAIRS = 5_000_000
+
+class AchievableGradeIndex:
+    """Every final grade the perfect scores and weights can produce, for instant target checks.
+
+    A final grade is x*step_i + y*step_j + z*step_k for component totals x, y, z. The index
+    keeps the sorted sums for the two smallest components; a lookup then binary-searches
+    that array once for every value of the largest component, all in one NumPy call.
+    """
+
+    def __init__(self, w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight):
+        import numpy as np
+
+        perfect_totals = [sum(w_perfect), sum(p_perfect), sum(a_perfect)]
+        weights = [w_weight, p_weight, a_weight]
+        steps = [w / t if t > 0 else 0 for w, t in zip(weights, perfect_totals)]
+        i, j, k = sorted(range(3), key=lambda c: perfect_totals[c])
+        if (perfect_totals[i] + 1) * (perfect_totals[j] + 1) > GRADE_INDEX_MAX_PAIRS:
+            raise ValueError("Perfect scores are too large to index.")
+
+        xs = np.arange(perfect_totals[i] + 1) * steps[i]
+        ys = np.arange(perfect_totals[j] + 1) * steps[j]
+        self._np = np
+        # first_pair remembers which (x, y) produced each sum, so a hit can be re-checked
+        self.partial, self.first_pair = np.unique((xs[:, None] + ys[None, :]).ravel(), return_index=True)
+        self.largest = np.arange(perfect_totals[k] + 1) * steps[k]
+        self.y_count = len(ys)
+        self.order = (i, j, k)
+        self.perfect_totals = perfect_totals
+        self.weights = weights
+
+    def _candidates(self, target):
+        """For every value of the largest component, the partial sums just below and above"""
+        np = self._np
+        pos = np.searchsorted(self.partial, target - self.largest)
+        positions = np.concatenate([np.clip(pos - 1, 0, len(self.partial) - 1), np.clip(pos, 0, len(self.partial) - 1)])
+        z = np.concatenate([np.arange(len(self.largest))] * 2)
+        return positions, z, self.partial[positions] + self.largest[z]
+
+    def nearest(self, target):
+        """Closest achievable final grade to target"""
+        _, _, candidates = self._candidates(target)
+        return float(candidates[self._np.argmin(self._np.abs(candidates - target))])
+
+    def is_achievable(self, target, tolerance=0.01):
+        """True when the exact solver would find a final grade within tolerance of target"""
+        np = self._np
+        positions, zs, candidates = self._candidates(target)
+        # The index adds the components up in a different order than the solver, so a grade
+        # right on the edge of the window can land on either side; recompute those the
+        # solver's way instead of trusting the index's own rounding
+        i, j, k = self.order
+        close = np.abs(candidates - target) <= tolerance + 1e-6
+        for position, z in zip(positions[close].tolist(), zs[close].tolist()):
+            totals = [0, 0, 0]
+            totals[i], totals[j] = divmod(int(self.first_pair[position]), self.y_count)
+            totals[k] = z
+            _, final = _final_from_totals(totals, self.perfect_totals, self.weights)
+            if abs(final - target) <= tolerance:
+                return True
+        return False
+
+    def snap(self, target, tolerance=0.01):
+        """Nearest achievable grade, rounded to 2 decimals when that is still within tolerance"""
+        nearest = self.nearest(target)
+        rounded = round(nearest, 2)
+        return rounded if abs(rounded - nearest) <= tolerance else nearest
+
+# ================== Solution Cache ==================
+SOLUTION_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".grade_generator_cache.sqlite3")
+
+class SolutionCache:
+    """Remembers solved score rows per (perfect scores, weights, target, tolerance, method).
+
+    Recently used keys live in an in-memory LRU; when a path is given they are also kept in
+    a SQLite file so the same setup next quarter is served without solving again. The file
+    is opened on first use, and new rows and access times are committed by flush(). Each key
+    holds up to `variants` distinct rows, handed out in turn, so students with the same
+    target don't all get the same scores.
+    """
+
+    # Methods that always return the same row, so one stored solution is the whole pool
+    DETERMINISTIC_METHODS = ("exact",)
+
+    def __init__(self, path=None, max_keys=512, max_disk_rows=50000, variants=5):
+        self.path = path
+        self.max_keys = max_keys
+        self.max_disk_rows = max_disk_rows
+        self.variants = variants
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._turn = {}
+        self._lock = threading.Lock()
+        self._db = None
+        # Keys served since the last flush, with when they were last used
+        self._used = {}
+
+    @classmethod
+    def worthwhile(cls, config):
+        """False for methods that solve faster than a lookup, so the cache is left alone"""
+        return config.get("method", "exact") not in cls.DETERMINISTIC_METHODS
+
+    def _connect(self):
+        """Open the SQLite file on first use; without one the cache just stays in memory"""
+        if self._db is not None or not self.path:
+            return self._db
+        try:
+            # Generation runs in a worker thread, so the connection is shared under the lock
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS solutions ("
+                "key TEXT NOT NULL, solution TEXT NOT NULL, used REAL NOT NULL, "
+                "PRIMARY KEY (key, solution))"
+            )
+            self._db.commit()
+        except sqlite3.Error:
+            self._db, self.path = None, None
+        return self._db
+
+    @staticmethod
+    def make_key(config, target):
+        key = [
+            config["w_perfect"], config["p_perfect"], config["a_perfect"],
+            config["w_weight"], config["p_weight"], config["a_weight"],
+            float(target), config.get("tolerance", 0.01), config.get("method", "exact")
+        ]
+        # Plain keys stay as they were, so existing cache files keep working
+        if constrained(config.get("constraints")):
+            key.append(config["constraints"])
+        if config.get("transmuted"):
+            key.append("transmuted")
+        return json.dumps(key, sort_keys=True)
+
+    def _pool_size(self, config):
+        return 1 if config.get("method", "exact") in self.DETERMINISTIC_METHODS else self.variants
+
+    def _load(self, key):
+        """Fetch the stored rows for key, from memory first and then from disk"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        solutions = []
+        if self._connect() is not None:
+            rows = self._db.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchall()
+            solutions = [_result_from_json(row[0]) for row in rows]
+        self._remember(key, solutions)
+        return solutions
+
+    def _remember(self, key, solutions):
+        self._memory[key] = solutions
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_keys:
+            old_key, _ = self._memory.popitem(last=False)
+            self._turn.pop(old_key, None)
+
+    def get(self, config, target):
+        """Return a cached result, or None while the pool for this key is still filling up"""
+        key = self.make_key(config, target)
+        with self._lock:
+            solutions = self._load(key)
+            if not solutions or len(solutions) < self._pool_size(config):
+                self.misses += 1
+                return None
+            self.hits += 1
+            turn = self._turn.get(key, 0)
+            self._turn[key] = turn + 1
+            if self._db is not None:
+                self._used[key] = time.time()
+            return copy.deepcopy(solutions[turn % len(solutions)])
+
+    def put(self, config, target, result):
+        """Add a freshly solved result to the pool for its key; it reaches the file on flush"""
+        key = self.make_key(config, target)
+        result = {k: v for k, v in result.items() if k not in ("Telemetry", "Student")}
+        encoded = json.dumps(result)
+        with self._lock:
+            solutions = self._load(key)
+            if any(json.dumps(s) == encoded for s in solutions) or len(solutions) >= self._pool_size(config):
+                return
+            solutions.append(copy.deepcopy(result))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO solutions (key, solution, used) VALUES (?, ?, ?)",
+                    (key, encoded, time.time())
+                )
+
+    def flush(self):
+        """Write the access times of the keys served since the last flush and commit once"""
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.executemany(
+                "UPDATE solutions SET used = ? WHERE key = ?", [(used, key) for key, used in self._used.items()]
+            )
+            self._used.clear()
+            self._evict_disk()
+            self._db.commit()
+
+    def _evict_disk(self):
+        """Drop the least recently used keys until the file is back under max_disk_rows"""
+        (count,) = self._db.execute("SELECT COUNT(*) FROM solutions").fetchone()
+        if count <= self.max_disk_rows:
+            return
+        self._db.execute(
+            "DELETE FROM solutions WHERE rowid IN "
+            "(SELECT rowid FROM solutions ORDER BY used LIMIT ?)",
+            (count - self.max_disk_rows,)
+        )
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "keys_in_memory": len(self._memory)}
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+def _result_from_json(text):
+    """Undo json.dumps on a result dict, turning the (scores, grade) pairs back into tuples"""
+    result = json.loads(text)
+    for comp in ("Written Works", "Performance Task", "Quarterly Assessment"):
+        result[comp] = tuple(result[comp])
+    return result
+
+def solve_class(targets, config, progress=None, cancel=None, cache=None, hook=None):
+    """Solve a whole class at once.
+
+    config holds w_perfect, p_perfect, a_perfect, w_weight, p_weight and a_weight, plus
+    optional tolerance, max_attempts, method, constraints and transmuted (targets are
+    transmuted grades, see target_window). A seed makes every random draw repeatable;
+    the numpy and random methods and the distinct enumeration each get their own
+    generator from it. With distinct set, students who share a target
+    get different rows, at least min_difference points apart, from one
+    find_distinct_combinations call per target. Returns one result per target, in order,
+    with failed students reported as {"Final Grade": target, "Error": ...}. Every result
+    carries a "Telemetry" dict (see solver_telemetry).
+
+    student_budget_ms and class_budget_ms turn on anytime solving: every student gets
+    whichever is smaller, its own budget or an even share of what is left of the class
+    budget, and a student who runs out of time (or attempts) gets the closest row the
+    search saw instead of an error. Such results carry "Miss", the grade reached minus
+    the target, and are never cached.
+
+    progress(done, total) is called after every student. Once cancel (a threading.Event)
+    is set, the remaining students are returned unsolved with a "Cancelled" error.
+    An optional SolutionCache is consulted before solving and filled afterwards, except
+    for methods that solve faster than a lookup (see SolutionCache.worthwhile).
+    hook(target, stats) must return a context manager; each solver call runs inside it,
+    which is where a profiler or a custom timer goes (see cprofile_hook).
+    """
+    targets = list(targets)
+    perfect_args = (
+        config["w_perfect"], config["p_perfect"], config["a_perfect"],
+        config["w_weight"], config["p_weight"], config["a_weight"]
+    )
+    max_attempts = config.get("max_attempts", 100000)
+    method = config.get("method", "exact")
+    constraints = config.get("constraints")
+    if cache is not None and not cache.worthwhile(config):
+        cache = None
+
+    student_budget = config.get("student_budget_ms")
+    class_budget = config.get("class_budget_ms")
+    anytime = bool(student_budget or class_budget)
+    class_end = time.perf_counter() + class_budget / 1000 if class_budget else None
+
+    def deadline_for(students_left, share=1):
+        """Deadline for the next solve, covering share students out of students_left"""
+        if not anytime:
+            return None
+        now = time.perf_counter()
+        budget = student_budget / 1000 * share if student_budget else math.inf
+        if class_end is not None:
+            budget = min(budget, max(class_end - now, 0) / students_left * share)
+        return now + budget
+
+    if method == "exact":
+        # One plan per tolerance; transmuted targets have a few different band widths
+        plans = {}
+
+        def solve(target, stats, deadline=None):
+            center, tolerance = target_window(target, config)
+            if tolerance not in plans:
+                plans[tolerance] = _exact_plan(*perfect_args, tolerance, constraints)
+            return _solve_exact(plans[tolerance], center, stats, deadline, anytime)
+    elif method == "numpy":
+        import numpy as np
+        rng = np.random.default_rng(config.get("seed"))
+        solve = lambda target, stats, deadline=None: find_numpy_combination(
+            *perfect_args, *target_window(target, config), max_attempts, rng=rng, stats=stats, constraints=constraints,
+            deadline=deadline, best_effort=anytime
+        )
+    else:
+        seed = config.get("seed")
+        rng = random.Random(str(seed)) if seed is not None else None
+        solve = lambda target, stats, deadline=None: find_combination(
+            *perfect_args, *target_window(target, config), max_attempts, method=method, stats=stats,
+            constraints=constraints, deadline=deadline, best_effort=anytime, rng=rng
+        )
+
+    # With "distinct", every group of students sharing a target is served different rows
+    # from one enumeration instead of one search each
+    distinct = config.get("distinct")
+    if distinct:
+        seed = config.get("seed")
+        group_rng = random.Random(str(seed)) if seed is not None else random.Random()
+        group_sizes = {}
+        for target in targets:
+            group_sizes[target] = group_sizes.get(target, 0) + 1
+    groups = {}
+
+    # The exact search is deterministic, so every distinct target only needs solving once
+    solved = {}
+    results = []
+    for index, target in enumerate(targets):
+        if cancel is not None and cancel.is_set():
+            results.extend(_cancelled_results(targets[index:]))
+            break
+        if distinct and group_sizes[target] > 1:
+            if target not in groups:
+                stats = {}
+                start = time.perf_counter()
+                center, tolerance = target_window(target, config)
+                deadline = deadline_for(len(targets) - index, group_sizes[target])
+                enumerate_group = lambda: find_distinct_combinations(
+                    *perfect_args, center, group_sizes[target], config.get("min_difference", 1), tolerance,
+                    constraints, group_rng, stats, deadline=deadline
+                )
+                if hook is None:
+                    rows = enumerate_group()
+                else:
+                    with hook(target, stats):
+                        rows = enumerate_group()
+                if not rows and anytime:
+                    # Nothing within tolerance: the whole group shares the closest row instead
+                    closest_stats = {}
+                    closest = solve(target, closest_stats, deadline)
+                    if closest_stats.get("approximate"):
+                        closest["Miss"] = result_miss(closest, target, config)
+                    rows = [closest] if closest else []
+                telemetry = solver_telemetry(
+                    "distinct", target, stats, time.perf_counter() - start, not rows and not stats.get("timed_out")
+                )
+                groups[target] = [rows, telemetry, 0]
+            rows, telemetry, served = groups[target]
+            groups[target][2] += 1
+            # Too few rows for the whole group: hand them out again rather than fail anyone
+            result = rows[served % len(rows)] if rows else None
+            if served:
+                telemetry = dict(telemetry, reused=True, seconds=0.0)
+        elif method == "exact" and target in solved:
+            result, telemetry = solved[target]
+            telemetry = dict(telemetry, reused=True, seconds=0.0)
+        else:
+            result = cache.get(config, target) if cache is not None else None
+            if result is not None:
+                telemetry = solver_telemetry("cache", target, {"attempts": 0, "best_distance": 0.0}, 0.0)
+            else:
+                stats = {}
+                start = time.perf_counter()
+                deadline = deadline_for(len(targets) - index)
+                if hook is None:
+                    result = solve(target, stats, deadline)
+                else:
+                    with hook(target, stats):
+                        result = solve(target, stats, deadline)
+                telemetry = solver_telemetry(method, target, stats, time.perf_counter() - start)
+                if stats.get("approximate"):
+                    result["Miss"] = result_miss(result, target, config)
+                elif result and cache is not None:
+                    cache.put(config, target, result)
+            solved[target] = result, telemetry
+        if result:
+            result = copy.deepcopy(result)
+        else:
+            result = {"Final Grade": target, "Error": "No matching combination found."}
+        result["Telemetry"] = telemetry
+        results.append(result)
+        if progress is not None:
+            progress(index + 1, len(targets))
+    if cache is not None:
+        cache.flush()
+    return results
+
+def solver_telemetry(method, target, stats, seconds, exhaustive=None):
+    """Per-student solver figures: which backend ran, how hard it tried and how close it got.
+
+    exhaustive is True when the backend searched every candidate, so a failure means the
+    target really can't be reached rather than that the search was unlucky. It defaults
+    to whether method is the exact search.
+    """
+    return {
+        "method": method,
+        "target": target,
+        "attempts": stats.get("attempts", 0),
+        "seconds": seconds,
+        "best_distance": stats.get("best_distance"),
+        "exhaustive": method == "exact" and not stats.get("timed_out") if exhaustive is None else exhaustive,
+        "reused": False,
+        "timed_out": bool(stats.get("timed_out")),
+    }
+
+def result_miss(result, target, config):
+    """How far a best-effort result landed from its target, in the target's own scale"""
+    final = result["Final Grade"]
+    grade = transmute(final) if config.get("transmuted") else final
+    return round(grade - target, 2)
+
+def cprofile_hook(profile):
+    """A solve_class hook that runs every solver call under the given cProfile.Profile"""
+    from contextlib import contextmanager
+
+    @contextmanager
+    def hook(target, stats):
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+    return hook
+
+def solver_summary(results):
+    """Totals over the "Telemetry" of a list of results, for status lines and reports"""
+    telemetry = [r["Telemetry"] for r in results if "Telemetry" in r]
+    failed = [t for r, t in ((r, r.get("Telemetry")) for r in results) if "Error" in r and t]
+    methods = {}
+    for t in telemetry:
+        methods[t["method"]] = methods.get(t["method"], 0) + 1
+    return {
+        "students": len(results),
+        "solved": sum("Error" not in r for r in results),
+        "seconds": sum(t["seconds"] for t in telemetry),
+        "attempts": sum(t["attempts"] for t in telemetry),
+        "slowest": max((t["seconds"] for t in telemetry), default=0.0),
+        "methods": methods,
+        # Failures after an exhaustive search are impossible targets, the rest ran out of attempts
+        "impossible": sum(t["exhaustive"] for t in failed),
+        "gave_up": sum(not t["exhaustive"] for t in failed),
+        "approximate": sum("Miss" in r for r in results),
+        "timed_out": sum(bool(t.get("timed_out")) for t in telemetry),
+    }
+
+def diagnostics_rows(results):
+    """One flat dict per student: outcome plus telemetry"""
+    rows = []
+    for i, result in enumerate(results, start=1):
+        telemetry = result.get("Telemetry", {})
+        rows.append({
+            "student": result.get("Student", str(i)),
+            "final": None if "Error" in result else result["Final Grade"],
+            "miss": result.get("Miss"),
+            "error": result.get("Error"),
+            **telemetry,
+        })
+    return rows
+
+def write_diagnostics_json(filename, results):
+    """Write solver_summary plus the per-student telemetry of results as JSON"""
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump({"summary": solver_summary(results), "students": diagnostics_rows(results)}, f, indent=2)
+
+def _cancelled_results(targets):
+    return [{"Final Grade": target, "Error": "Cancelled before solving."} for target in targets]
+
+# ================== Incremental Regeneration ==================
+# Result key, perfect-score key and weight key of every component
+RESULT_COMPONENTS = (
+    ("Written Works", "w_perfect", "w_weight"),
+    ("Performance Task", "p_perfect", "p_weight"),
+    ("Quarterly Assessment", "a_perfect", "a_weight"),
+)
+
+def rescore_result(result, config, target):
+    """Re-grade result's scores under config; None when they no longer fit it.
+
+    The scores must line up one for one with the perfect scores, stay within them and
+    any constraints, and still give a final grade within the tolerance of target.
+    """
+    if "Error" in result:
+        return None
+    center, tolerance = target_window(target, config)
+    perfects = [config[perfect_key] for _, perfect_key, _ in RESULT_COMPONENTS]
+    if any(len(result[c][0]) != len(p) for (c, _, _), p in zip(RESULT_COMPONENTS, perfects)):
+        return None
+    constraints = config.get("constraints")
+    if constrained(constraints):
+        bounds = activity_bounds(perfects, center, constraints)
+        spreads = component_spreads(constraints)
+    else:
+        bounds = [([0] * len(p), p) for p in perfects]
+        spreads = [None] * 3
+    rescored = {}
+    final = 0
+    for (component, _, weight_key), perfect, (low, high), spread in zip(RESULT_COMPONENTS, perfects, bounds, spreads):
+        scores = result[component][0]
+        if any(not l <= s <= h for s, l, h in zip(scores, low, high)) or not within_spread(scores, perfect, spread):
+            return None
+        grade = calculate_component_grade(scores, perfect)
+        rescored[component] = (list(scores), grade)
+        final += grade * config[weight_key] / 100
+    if abs(final - center) > tolerance:
+        return None
+    rescored["Final Grade"] = round(final, 2)
+    return rescored
+
+def reuse_results(previous_targets, previous_results, targets, config):
+    """Carry results of the previous run over to a new one wherever they still hold.
+
+    Returns one entry per target: a rescored result, or None for a student that has to be
+    solved again. A student keeps their own previous row when their target is unchanged;
+    rows left over (e.g. after the roster was reordered) go to other students with the
+    same target, each row to one student only.
+    """
+    reused = [None] * len(targets)
+    spare = {}
+    for i, (old_target, old_result) in enumerate(zip(previous_targets, previous_results)):
+        if i < len(targets) and targets[i] == old_target:
+            reused[i] = rescore_result(old_result, config, targets[i])
+            if reused[i] is not None:
+                continue
+        spare.setdefault(old_target, []).append(old_result)
+
+    for i, target in enumerate(targets):
+        candidates = spare.get(target, [])
+        while reused[i] is None and candidates:
+            reused[i] = rescore_result(candidates.pop(0), config, target)
+
+    for result, target in zip(reused, targets):
+        if result is not None:
+            telemetry = solver_telemetry("previous", target, {"best_distance": abs(result["Final Grade"] - target)}, 0.0)
+            result["Telemetry"] = dict(telemetry, reused=True)
+    return reused
+
+# Students are always split into chunks of this size, whatever the worker count, so a
+# seeded run gives the same grades with 1 worker or 8
+PARALLEL_CHUNK_SIZE = 8
+# Below this many students, process start-up costs more than the solving itself
+PARALLEL_MIN_STUDENTS = 40
+
+def _solve_chunk(args):
+    """Solve one slice of the roster with its own seeded random streams"""
+    index, targets, config = args
+    # Every solver seeds its own generator from this, so chunks never share random state
+    config = dict(config, seed=[index, config["seed"]])
+    return solve_class(targets, config)
+
+def solve_class_parallel(targets, config, workers=None, progress=None, cancel=None, cache=None, pool=None,
+                         on_chunk=None):
+    """Like solve_class, but spreads the students over a pool of worker processes.
+
+    Falls back to solving in this process when there is only one worker or the class
+    is too small to be worth it. Results always come back in roster order. A
+    class_budget_ms is shared out over the chunks by size, taking into account that
+    the workers solve chunks side by side.
+
+    pool is an already running executor to submit the chunks to instead of starting one
+    per call; it is always used, whatever the class size, and left running afterwards.
+    on_chunk(positions, results) gets every slice of results as soon as it is solved,
+    with the roster positions they belong to, in completion order.
+    """
+    targets = list(targets)
+    if config.get("distinct"):
+        return _solve_parallel_distinct(targets, config, workers, progress, cancel, cache, pool, on_chunk)
+    if cache is not None and cache.worthwhile(config):
+        return _solve_parallel_cached(targets, config, workers, progress, cancel, cache, pool, on_chunk)
+    config = dict(config)
+    if config.get("seed") is None:
+        config["seed"] = random.SystemRandom().randrange(2 ** 32)
+    workers = workers or os.cpu_count() or 1
+    in_process = pool is None and (workers <= 1 or len(targets) < PARALLEL_MIN_STUDENTS)
+
+    chunks = [
+        (index, targets[start:start + PARALLEL_CHUNK_SIZE], config)
+        for index, start in enumerate(range(0, len(targets), PARALLEL_CHUNK_SIZE))
+    ]
+    if config.get("class_budget_ms"):
+        lanes = 1 if in_process else min(workers, len(chunks))
+        chunks = [
+            (index, chunk, _budget_share(config, len(chunk) * lanes, len(targets)))
+            for index, chunk, _ in chunks
+        ]
+    chunk_results = [None] * len(chunks)
+    done = 0
+
+    def finish(index, results):
+        nonlocal done
+        chunk_results[index] = results
+        done += len(results)
+        if on_chunk is not None:
+            start = index * PARALLEL_CHUNK_SIZE
+            on_chunk(range(start, start + len(results)), results)
+        if progress is not None:
+            progress(done, len(targets))
+
+    def run(pool):
+        from concurrent.futures import as_completed
+
+        futures = {pool.submit(_solve_chunk, chunk): chunk[0] for chunk in chunks}
+        for future in as_completed(futures):
+            finish(futures[future], future.result())
+            if cancel is not None and cancel.is_set():
+                # Chunks already running still finish; queued ones are dropped
+                for pending in futures:
+                    pending.cancel()
+                break
+
+    if in_process:
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                break
+            finish(chunk[0], _solve_chunk(chunk))
+    elif pool is not None:
+        run(pool)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            run(pool)
+
+    results = []
+    for chunk, solved in zip(chunks, chunk_results):
+        results.extend(solved if solved is not None else _cancelled_results(chunk[1]))
+    return results
+
+def _solve_parallel_distinct(targets, config, workers, progress, cancel, cache, pool=None, on_chunk=None):
+    """Enumerate shared targets here, one search per target, and pool the rest.
+
+    Split over chunks, a shared target would be enumerated once per chunk and the chunks
+    would hand out many of the same rows.
+    """
+    sizes = {}
+    for target in targets:
+        sizes[target] = sizes.get(target, 0) + 1
+    shared = [i for i, target in enumerate(targets) if sizes[target] > 1]
+    single = [i for i, target in enumerate(targets) if sizes[target] == 1]
+    results = [None] * len(targets)
+
+    def shared_progress(done, total):
+        if progress is not None:
+            progress(done, len(targets))
+
+    def single_progress(done, total):
+        if progress is not None:
+            progress(len(shared) + done, len(targets))
+
+    start = time.perf_counter()
+    shared_config = _budget_share(config, len(shared), len(targets))
+    shared_results = solve_class([targets[i] for i in shared], shared_config, shared_progress, cancel, cache)
+    for i, result in zip(shared, shared_results):
+        results[i] = result
+    if on_chunk is not None and shared:
+        on_chunk(shared, shared_results)
+    single_config = dict(config, distinct=False)
+    if config.get("class_budget_ms"):
+        spent = (time.perf_counter() - start) * 1000
+        single_config["class_budget_ms"] = max(config["class_budget_ms"] - spent, 1)
+    single_chunk = None if on_chunk is None else lambda positions, chunk: on_chunk([single[p] for p in positions], chunk)
+    solved = solve_class_parallel(
+        [targets[i] for i in single], single_config, workers, single_progress, cancel, cache, pool, single_chunk
+    )
+    for i, result in zip(single, solved):
+        results[i] = result
+    return results
+
+def _budget_share(config, part, whole):
+    """config with its class_budget_ms cut down to part/whole of the class"""
+    if not config.get("class_budget_ms") or not whole:
+        return config
+    return dict(config, class_budget_ms=config["class_budget_ms"] * part / whole)
+
+def _solve_parallel_cached(targets, config, workers, progress, cancel, cache, pool=None, on_chunk=None):
+    """Serve what the cache can in this process and only send the misses to the pool"""
+    results = [cache.get(config, target) for target in targets]
+    missing = [i for i, result in enumerate(results) if result is None]
+    for result, target in zip(results, targets):
+        if result is not None:
+            result["Telemetry"] = solver_telemetry("cache", target, {"attempts": 0, "best_distance": 0.0}, 0.0)
+    hits = len(targets) - len(missing)
+    if on_chunk is not None and hits:
+        served = [i for i, result in enumerate(results) if result is not None]
+        on_chunk(served, [results[i] for i in served])
+
+    def missing_progress(done, total):
+        if progress is not None:
+            progress(hits + done, len(targets))
+
+    missing_chunk = None if on_chunk is None else lambda positions, chunk: on_chunk([missing[p] for p in positions], chunk)
+    solved = solve_class_parallel(
+        [targets[i] for i in missing], config, workers, missing_progress, cancel, pool=pool, on_chunk=missing_chunk
+    )
+    for i, result in zip(missing, solved):
+        results[i] = result
+        if "Error" not in result and "Miss" not in result:
+            cache.put(config, targets[i], result)
+    cache.flush()
+    return results
+
+# ================== Result Store ==================
+class ResultStore:
+    """A solved class kept in flat arrays instead of one dict of lists per student.
+
+    scores is the students x activities score matrix, row-major, with the written,
+    performance and assessment activities side by side. grades holds the three component
+    grades of every student and final the final grade (the target, for failed students);
+    failed is the status mask and miss the "Miss" of best-effort results (nan when the
+    student was solved within tolerance). Error messages, names and telemetry are kept
+    per column or only for the students that have them.
+
+    Indexing or iterating still gives the old per-student result dicts, so code written
+    against lists of results keeps working.
+    """
+    TELEMETRY_FLAGS = ("exhaustive", "reused", "timed_out")
+    COLUMNS = ("scores", "grades", "final", "failed", "miss", "t_method", "t_target", "t_attempts", "t_seconds",
+               "t_best", "t_flags")
+
+    def __init__(self, counts):
+        self.counts = tuple(counts)
+        self.width = sum(self.counts)
+        self.scores = array("i")
+        self.grades = array("d")
+        self.final = array("d")
+        self.failed = array("b")
+        self.miss = array("d")
+        self.errors = {}
+        self.names = {}
+        # Telemetry, one column per field; method -1 means the student has none
+        self.methods = []
+        self.t_method = array("b")
+        self.t_target = array("d")
+        self.t_attempts = array("q")
+        self.t_seconds = array("d")
+        self.t_best = array("d")
+        self.t_flags = array("b")
+
+    @classmethod
+    def for_config(cls, config):
+        return cls(len(config[key]) for key in ("w_perfect", "p_perfect", "a_perfect"))
+
+    @classmethod
+    def from_results(cls, results, config):
+        store = cls.for_config(config)
+        store.extend(results)
+        return store
+
+    def columns(self):
+        """The arrays that hold the class, by attribute name"""
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    def sparse(self):
+        """Everything besides the arrays, as plain JSON values"""
+        return {
+            "counts": list(self.counts),
+            "methods": self.methods,
+            "errors": {str(i): error for i, error in self.errors.items()},
+            "names": {str(i): name for i, name in self.names.items()},
+        }
+
+    @classmethod
+    def from_columns(cls, sparse, columns):
+        """Rebuild a store from sparse() and columns() output without touching any student"""
+        store = cls(sparse["counts"])
+        for name in cls.COLUMNS:
+            setattr(store, name, columns[name])
+        store.methods = list(sparse["methods"])
+        store.errors = {int(i): error for i, error in sparse["errors"].items()}
+        store.names = {int(i): name for i, name in sparse["names"].items()}
+        return store
+
+    def append(self, result):
+        index = len(self.final)
+        if "Error" in result:
+            self.scores.extend([0] * self.width)
+            self.grades.extend((0.0, 0.0, 0.0))
+            self.failed.append(1)
+            self.errors[index] = result["Error"]
+        else:
+            for (component, _, _), count in zip(RESULT_COMPONENTS, self.counts):
+                scores, grade = result[component]
+                if len(scores) != count:
+                    raise ValueError(f"{component} has {len(scores)} scores, expected {count}.")
+                self.scores.extend(scores)
+                self.grades.append(grade)
+            self.failed.append(0)
+        self.final.append(result["Final Grade"])
+        self.miss.append(result.get("Miss", math.nan))
+        if result.get("Student"):
+            self.names[index] = result["Student"]
+        self._append_telemetry(result.get("Telemetry"))
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+
+    def _append_telemetry(self, telemetry):
+        if telemetry is None:
+            self.t_method.append(-1)
+            self.t_target.append(0.0)
+            self.t_attempts.append(0)
+            self.t_seconds.append(0.0)
+            self.t_best.append(math.nan)
+            self.t_flags.append(0)
+            return
+        if telemetry["method"] not in self.methods:
+            self.methods.append(telemetry["method"])
+        self.t_method.append(self.methods.index(telemetry["method"]))
+        self.t_target.append(telemetry["target"])
+        self.t_attempts.append(telemetry["attempts"])
+        self.t_seconds.append(telemetry["seconds"])
+        best = telemetry["best_distance"]
+        self.t_best.append(math.nan if best is None else best)
+        self.t_flags.append(sum(bool(telemetry.get(flag)) << bit for bit, flag in enumerate(self.TELEMETRY_FLAGS)))
+
+    def telemetry(self, index):
+        """The telemetry dict of one student, or None"""
+        method = self.t_method[index]
+        if method < 0:
+            return None
+        best = self.t_best[index]
+        telemetry = {
+            "method": self.methods[method],
+            "target": self.t_target[index],
+            "attempts": self.t_attempts[index],
+            "seconds": self.t_seconds[index],
+            "best_distance": None if math.isnan(best) else best,
+        }
+        for bit, flag in enumerate(self.TELEMETRY_FLAGS):
+            telemetry[flag] = bool(self.t_flags[index] >> bit & 1)
+        return telemetry
+
+    def __len__(self):
+        return len(self.final)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("result index out of range")
+        if self.failed[index]:
+            result = {"Final Grade": self.final[index], "Error": self.errors[index]}
+        else:
+            result = {
+                component: (scores, self.grades[3 * index + c])
+                for c, ((component, _, _), scores) in enumerate(zip(RESULT_COMPONENTS, self.component_scores(index)))
+            }
+            result["Final Grade"] = self.final[index]
+            if not math.isnan(self.miss[index]):
+                result["Miss"] = self.miss[index]
+        if index in self.names:
+            result["Student"] = self.names[index]
+        telemetry = self.telemetry(index)
+        if telemetry is not None:
+            result["Telemetry"] = telemetry
+        return result
+
+    def component_scores(self, index):
+        """The written, performance and assessment score lists of one student"""
+        row = self.scores[index * self.width:(index + 1) * self.width].tolist()
+        w, p, _ = self.counts
+        return row[:w], row[w:w + p], row[w + p:]
+
+    def component_grades(self, index):
+        return tuple(self.grades[3 * index:3 * index + 3])
+
+    def label(self, index):
+        """Student name, or the 1-based roster position when there is none"""
+        return self.names.get(index, str(index + 1))
+
+    def set_names(self, names):
+        self.names = {i: name for i, name in enumerate(names) if name}
+
+    @property
+    def failures(self):
+        return sum(self.failed)
+
+    @property
+    def approximations(self):
+        """How many students got a best-effort result instead of one within tolerance"""
+        return sum(not math.isnan(miss) for miss in self.miss)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays; the sparse dicts are not counted"""
+        return sum(column.itemsize * len(column) for column in self.columns().values())
+
+# ================== Session Snapshots ==================
+SESSION_PATH = os.path.join(os.path.expanduser("~"), ".grade_generator_autosave.gradesession")
+SESSION_MAGIC = b"GGSESS01"
+
+def _pack_columns(columns):
+    """(layout, bytes) for a dict of arrays, concatenated in order"""
+    layout = [[name, column.typecode, len(column)] for name, column in columns.items()]
+    return layout, b"".join(column.tobytes() for column in columns.values())
+
+def _unpack_columns(layout, data, offset, swap):
+    """Arrays of a _pack_columns layout read from data at offset; returns (columns, end offset)"""
+    columns = {}
+    for name, typecode, length in layout:
+        column = array(typecode)
+        end = offset + column.itemsize * length
+        column.frombytes(data[offset:end])
+        if swap:
+            column.byteswap()
+        columns[name] = column
+        offset = end
+    return columns, offset
+
+def save_session(filename, session):
+    """Write a session snapshot: a small JSON header followed by raw array columns.
+
+    session holds plain JSON values; array values and ResultStore values (at the top
+    level) are stored as their raw column bytes, zlib-compressed, so loading a large class
+    back costs a decompress and a few array copies instead of a solve. The file is
+    replaced atomically, so an autosave that dies halfway keeps the previous snapshot.
+    """
+    header = {"byteorder": sys.byteorder, "values": {}, "arrays": [], "stores": {}}
+    columns = {}
+    for key, value in session.items():
+        if isinstance(value, ResultStore):
+            header["stores"][key] = value.sparse()
+            columns.update((f"{key}.{name}", column) for name, column in value.columns().items())
+        elif isinstance(value, array):
+            header["arrays"].append(key)
+            columns[key] = value
+        else:
+            header["values"][key] = value
+    header["columns"], data = _pack_columns(columns)
+    header = json.dumps(header).encode("utf-8")
+    data = zlib.compress(data, 1)
+
+    temporary = filename + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(SESSION_MAGIC + struct.pack("<II", len(header), len(data)))
+        f.write(header)
+        f.write(data)
+    os.replace(temporary, filename)
+
+def load_session(filename):
+    """Read a save_session snapshot back into a dict; raises ValueError for a damaged file"""
+    with open(filename, "rb") as f:
+        raw = f.read()
+    start = len(SESSION_MAGIC) + 8
+    if raw[:len(SESSION_MAGIC)] != SESSION_MAGIC or len(raw) < start:
+        raise ValueError("Not a grade generator session file.")
+    header_size, data_size = struct.unpack("<II", raw[len(SESSION_MAGIC):start])
+    if len(raw) != start + header_size + data_size:
+        raise ValueError("The session file is incomplete.")
+    try:
+        header = json.loads(raw[start:start + header_size].decode("utf-8"))
+        data = zlib.decompress(raw[start + header_size:])
+        columns, end = _unpack_columns(header["columns"], data, 0, header["byteorder"] != sys.byteorder)
+        if end != len(data):
+            raise ValueError("column sizes don't match the data")
+    except (ValueError, KeyError, zlib.error) as e:
+        raise ValueError(f"The session file is damaged: {e}")
+
+    session = dict(header["values"])
+    for key in header["arrays"]:
+        session[key] = columns[key]
+    for key, sparse in header["stores"].items():
+        prefix = f"{key}."
+        store_columns = {name[len(prefix):]: column for name, column in columns.items() if name.startswith(prefix)}
+        session[key] = ResultStore.from_columns(sparse, store_columns)
+    return session
+
+# ================== Roster Import ==================
+# Header cells naming each column, matched whole and in order of preference
+ROSTER_NAME_HEADERS = ("name", "student name", "full name", "student")
+ROSTER_TARGET_HEADERS = ("target", "target grade", "grade", "final grade")
+
+def _roster_rows(path):
+    """Yield the raw rows of a CSV or XLSX roster one at a time"""
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield ["" if v is None else v for v in row]
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.reader(f)
+
+def _header_cell(cell):
+    return " ".join(str(cell).lower().split())
+
+def _find_column(header, names):
+    """Column of the first of names found in header, or None"""
+    cells = [_header_cell(cell) for cell in header]
+    for name in names:
+        if name in cells:
+            return cells.index(name)
+    return None
+
+def read_roster(path):
+    """Read student names and target grades from a CSV or XLSX roster.
+
+    The first non-blank row is a header when one of its cells is a known column name
+    (ROSTER_NAME_HEADERS, ROSTER_TARGET_HEADERS); otherwise the first column is the name
+    and the second the target. Every row is validated and all problems are reported
+    together. Returns (names, targets).
+    """
+    names, targets, errors = [], [], []
+    name_col, target_col = 0, 1
+    first = True
+    for line, row in enumerate(_roster_rows(path), 1):
+        if not any(str(cell).strip() for cell in row):
+            continue
+        if first:
+            first = False
+            name_col, target_col = _find_column(row, ROSTER_NAME_HEADERS), _find_column(row, ROSTER_TARGET_HEADERS)
+            if name_col is not None or target_col is not None:
+                if name_col is None or target_col is None:
+                    raise ValueError(
+                        f"Row {line} looks like a header but needs both a name and a target column "
+                        f"(e.g. \"Name\" and \"Target\")."
+                    )
+                continue
+            name_col, target_col = 0, 1
+        
+        name = str(row[name_col]).strip() if name_col < len(row) else ""
+        try:
+            target = float(row[target_col])
+            if not 0 <= target <= 100:
+                raise ValueError
+        except (ValueError, IndexError):
+            errors.append(f"Row {line}: target must be a number from 0 to 100")
+            continue
+        if not name:
+            errors.append(f"Row {line}: missing student name")
+            continue
+        names.append(name)
+        targets.append(target)
+    
+    if errors:
+        shown = "\n".join(errors[:10])
+        more = f"\n...and {len(errors) - 10} more" if len(errors) > 10 else ""
+        raise ValueError(f"{len(errors)} invalid roster row(s):\n{shown}{more}")
+    if not targets:
+        raise ValueError("The roster has no students.")
+    return names, targets
+
+# ================== Excel Export ==================
+def _excel_header_rows(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight):
+    """The three header rows: component names, activity numbers and perfect scores.
+
+    The last two columns are the initial grade and its transmuted grade.
+    """
+    # Header row 1 - Component names and weights
+    header1 = [''] + [f'WRITTEN WORKS ({w_weight}%)'] + [''] * (len(w_perfect) + 1) + \
+             [f'PERFORMANCE TASKS ({p_weight}%)'] + [''] * (len(p_perfect) + 1) + \
+             [f'QUARTERLY ASSESSMENT ({a_weight}%)', '', 'Initial']
+    
+    # Header row 2 - Activity numbers and totals
+    header2 = [''] + [str(i+1) for i in range(len(w_perfect))] + ['Total', 'PS', 'WS'] + \
+             [str(i+1) for i in range(len(p_perfect))] + ['Total', 'PS', 'WS'] + \
+             [str(i+1) for i in range(len(a_perfect))] + ['PS', 'WS', 'Grade']
+    
+    # Perfect scores row
+    perfect_row = [''] + w_perfect + [sum(w_perfect), 100.00, f'{w_weight}%'] + \
+                 p_perfect + [sum(p_perfect), 100.00, f'{p_weight}%'] + \
+                 a_perfect + [100.00, f'{a_weight}%', '']
+    
+    # Transmuted grade column, labelled directly above its own column
+    header1 += [''] * (len(header2) - len(header1)) + ['Transmuted']
+    header2 += ['Grade']
+    perfect_row += ['']
+    return [header1, header2, perfect_row]
+
+def _student_row(label, result, w_weight, p_weight, a_weight):
+    """One sheet row for a solved student"""
+    return _grade_row(
+        label, [result[c][0] for c, _, _ in RESULT_COMPONENTS], [result[c][1] for c, _, _ in RESULT_COMPONENTS],
+        result["Final Grade"], w_weight, p_weight, a_weight
+    )
+
+def _grade_row(label, scores, grades, final_grade, w_weight, p_weight, a_weight):
+    """One sheet row from the three score lists and component grades"""
+    w_scores, p_scores, a_scores = scores
+    w_grade, p_grade, a_grade = grades
+    
+    return [label] + w_scores + [sum(w_scores), f'{w_grade:.2f}', f'{(w_grade * w_weight / 100):.2f}'] + \
+           p_scores + [sum(p_scores), f'{p_grade:.2f}', f'{(p_grade * p_weight / 100):.2f}'] + \
+           a_scores + [f'{a_grade:.2f}', f'{(a_grade * a_weight / 100):.2f}', f'{final_grade:.2f}',
+                       transmute(final_grade)]
+
+def _column_widths(header_rows, widest_row):
+    """Column widths from the fixed layout, capped at 15 like the old auto-size pass"""
+    widths = []
+    for col in range(max(len(row) for row in header_rows + [widest_row])):
+        values = [row[col] for row in header_rows + [widest_row] if col < len(row)] + ['ERROR']
+        widths.append(min(max(len(str(v)) for v in values if v != '') + 2, 15))
+    return widths
+
+GRADE_KEYS = ("w_perfect", "p_perfect", "a_perfect", "w_weight", "p_weight", "a_weight")
+
+def _header_style():
+    """The bold grey header style, registered once per workbook and shared by every sheet"""
+    from openpyxl.styles import NamedStyle, Font, Alignment, PatternFill
+    
+    style = NamedStyle(name="grade_header")
+    style.font = Font(bold=True, size=10)
+    style.fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+    style.alignment = Alignment(horizontal="center", vertical="center")
+    return style
+
+def sheet_title(subject, section=None, taken=()):
+    """Excel-safe, unique sheet name: at most 31 characters and none of []:*?/\\"""
+    return unique_sheet_title(f'{section} {subject}' if section else f'{subject} Grades', taken)
+
+def unique_sheet_title(title, taken=()):
+    """title made Excel-safe and, with a numbered suffix, different from every name in taken"""
+    title = "".join("-" if ch in '[]:*?/\\' else ch for ch in title)[:31]
+    base, n = title, 2
+    while title in taken:
+        suffix = f' ({n})'
+        title = base[:31 - len(suffix)] + suffix
+        n += 1
+    return title
+
+def _write_grade_sheet(workbook, title, results, w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight):
+    """Stream one grade sheet into a write-only workbook"""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+    
+    header_rows = _excel_header_rows(w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight)
+    header2 = header_rows[1]
+    
+    # A full-marks row is as wide as any student row can get
+    if isinstance(results, ResultStore):
+        label = max([str(len(results))] + list(results.names.values()), key=len)
+    elif hasattr(results, "__len__"):
+        label = max([str(len(results))] + [r.get("Student", "") for r in results], key=len)
+    else:
+        label = "X" * 15
+    widest_row = _student_row(label, {
+        "Written Works": (w_perfect, 100.0),
+        "Performance Task": (p_perfect, 100.0),
+        "Quarterly Assessment": (a_perfect, 100.0),
+        "Final Grade": 100.0
+    }, w_weight, p_weight, a_weight)
+    widths = _column_widths(header_rows, widest_row)
+    
+    worksheet = workbook.create_sheet(title)
+    for col, width in enumerate(widths, 1):
+        worksheet.column_dimensions[get_column_letter(col)].width = width
+    
+    for row in header_rows:
+        cells = []
+        for col in range(len(widths)):
+            value = row[col] if col < len(row) and row[col] != '' else None
+            cell = WriteOnlyCell(worksheet, value=value)
+            cell.style = "grade_header"
+            cells.append(cell)
+        worksheet.append(cells)
+    
+    # Add student data; a ResultStore is read straight from its arrays
+    if isinstance(results, ResultStore):
+        for i in range(len(results)):
+            if results.failed[i]:
+                worksheet.append([results.label(i)] + ['ERROR'] * (len(header2) - 1))
+            else:
+                worksheet.append(_grade_row(
+                    results.label(i), results.component_scores(i), results.component_grades(i),
+                    results.final[i], w_weight, p_weight, a_weight
+                ))
+        return
+    for i, result in enumerate(results, 1):
+        label = result.get("Student", str(i))
+        if "Error" not in result:
+            worksheet.append(_student_row(label, result, w_weight, p_weight, a_weight))
+        else:
+            worksheet.append([label] + ['ERROR'] * (len(header2) - 1))
+
+DIAGNOSTICS_COLUMNS = ("student", "target", "final", "method", "attempts", "seconds",
+                       "best_distance", "exhaustive", "reused", "timed_out", "miss", "error")
+
+def _write_diagnostics_sheet(workbook, title, results):
+    """Stream the per-student solver telemetry of results into a write-only workbook"""
+    from openpyxl.cell import WriteOnlyCell
+
+    worksheet = workbook.create_sheet(title)
+    header = []
+    for name in DIAGNOSTICS_COLUMNS:
+        cell = WriteOnlyCell(worksheet, value=name.replace("_", " ").title())
+        cell.style = "grade_header"
+        header.append(cell)
+    worksheet.append(header)
+    for row in diagnostics_rows(results):
+        worksheet.append([row.get(name) for name in DIAGNOSTICS_COLUMNS])
+
+def write_excel_workbook(filename, sheets):
+    """Write several grade sheets into one workbook in a single pass.
+
+    Each item of sheets is a dict with subject, results and the six grading keys
+    (w_perfect ... a_weight), plus an optional section, or a title to use as the sheet
+    name as it is. Every sheet is streamed in
+    write-only mode, so sheets can be produced lazily by a generator. A sheet with a true
+    "diagnostics" key gets a second sheet listing the solver telemetry of every student.
+    """
+    from openpyxl import Workbook
+    
+    # Open the output first so a bad path fails before any sheet is streamed
+    with open(filename, "wb") as f:
+        workbook = Workbook(write_only=True)
+        workbook.add_named_style(_header_style())
+        titles = set()
+        for sheet in sheets:
+            if sheet.get("title"):
+                title = unique_sheet_title(sheet["title"], titles)
+            else:
+                title = sheet_title(sheet["subject"], sheet.get("section"), titles)
+            titles.add(title)
+            results = sheet["results"]
+            if sheet.get("diagnostics") and not isinstance(results, (list, ResultStore)):
+                results = list(results)
+            _write_grade_sheet(workbook, title, results, *(sheet[key] for key in GRADE_KEYS))
+            if sheet.get("diagnostics"):
+                title = sheet_title("Diagnostics", title, titles)
+                titles.add(title)
+                _write_diagnostics_sheet(workbook, title, results)
+        workbook.save(f)
+
+def write_excel_file(filename, results, subject, w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight):
+    """Stream the grade sheet to filename.
+
+    Uses openpyxl's write-only mode, so rows go straight from results to disk and memory
+    stays flat however many students there are. results may be any iterable.
+    """
+    write_excel_workbook(filename, [{
+        "subject": subject,
+        "results": results,
+        "w_perfect": w_perfect,
+        "p_perfect": p_perfect,
+        "a_perfect": a_perfect,
+        "w_weight": w_weight,
+        "p_weight": p_weight,
+        "a_weight": a_weight,
+    }])
+
+# ================== Recorded Scores ==================
+def _percent(value):
+    """A weight cell such as '30%' or 30 as a number, whole numbers as int"""
+    value = float(str(value).strip().rstrip("%"))
+    return int(value) if value.is_integer() else value
+
+def _record_layout(header2, perfect_row):
+    """Activity columns, perfect scores and weights of a grade sheet, from its second and third header rows"""
+    header2 = ["" if v is None else str(v).strip() for v in header2]
+    perfect_row = list(perfect_row) + [None] * (len(header2) - len(perfect_row))
+    totals = [col for col, label in enumerate(header2) if label == "Total"]
+    if len(totals) < 2 or header2[totals[0] + 1:totals[0] + 3] != ["PS", "WS"] \
+            or header2[totals[1] + 1:totals[1] + 3] != ["PS", "WS"] or "PS" not in header2[totals[1] + 3:]:
+        raise ValueError("the header rows are not in the grade sheet layout")
+    a_end = header2.index("PS", totals[1] + 3)
+    columns = [range(1, totals[0]), range(totals[0] + 3, totals[1]), range(totals[1] + 3, a_end)]
+    layout = {"columns": [col for block in columns for col in block], "counts": [len(block) for block in columns]}
+    try:
+        for key, block in zip(("w_perfect", "p_perfect", "a_perfect"), columns):
+            layout[key] = [int(perfect_row[col]) for col in block]
+        for key, col in (("w_weight", totals[0] + 2), ("p_weight", totals[1] + 2), ("a_weight", a_end + 1)):
+            layout[key] = _percent(perfect_row[col])
+    except (TypeError, ValueError):
+        raise ValueError("the perfect score row is incomplete")
+    return layout
+
+def _score_matrix(rows, columns):
+    """Students x activities float matrix of the given columns; blank cells count as 0.
+
+    Returns (scores, errors) with errors mapping a row position to a message for cells
+    that are not numbers. The common all-numeric case is converted in one NumPy call.
+    """
+    import numpy as np
+
+    cells = [[row[col] if col < len(row) else None for col in columns] for row in rows]
+    errors = {}
+    try:
+        scores = np.array(cells, dtype=float).reshape(len(rows), len(columns))
+    except (TypeError, ValueError):
+        scores = np.empty((len(rows), len(columns)))
+        for i, row in enumerate(cells):
+            for j, value in enumerate(row):
+                try:
+                    scores[i, j] = float(value) if value not in (None, "") else math.nan
+                except (TypeError, ValueError):
+                    scores[i, j] = math.nan
+                    errors.setdefault(i, f"{value!r} is not a score")
+    return np.nan_to_num(scores, nan=0.0), errors
+
+def read_class_record(path):
+    """Read every grade sheet of an .xlsx class record written in the create_excel_file layout.
+
+    Returns one dict per sheet holding its title, the six grading keys, the student names,
+    the score matrix (students x activities, written then performance then assessment),
+    each student's row number in the sheet and the errors found per student. Sheets in any other layout are left out.
+    """
+    import zipfile
+    import numpy as np
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile) as e:
+        raise ValueError(f"Can't read {os.path.basename(path)} as a workbook: {e}")
+    records = []
+    try:
+        for worksheet in workbook.worksheets:
+            rows = worksheet.iter_rows(values_only=True)
+            header = list(itertools.islice(rows, 3))
+            if len(header) < 3:
+                continue
+            try:
+                layout = _record_layout(header[1], header[2])
+            except ValueError:
+                continue
+            numbered = [
+                (number, row) for number, row in enumerate(rows, 4) if any(cell not in (None, "") for cell in row)
+            ]
+            students = [row for _, row in numbered]
+            scores, errors = _score_matrix(students, layout.pop("columns"))
+            perfect = np.array(layout["w_perfect"] + layout["p_perfect"] + layout["a_perfect"])
+            for i in np.flatnonzero(((scores < 0) | (scores > perfect)).any(axis=1)).tolist():
+                errors.setdefault(i, "a score is below 0 or above its perfect score")
+            records.append(dict(
+                layout, title=worksheet.title, scores=scores, errors=errors,
+                names=["" if row[0] is None else str(row[0]) for row in students],
+                row_numbers=[number for number, _ in numbered],
+            ))
+    finally:
+        workbook.close()
+    return records
+
+def grade_scores(scores, w_perfect, p_perfect, a_perfect, w_weight, p_weight, a_weight):
+    """Grade a whole class of recorded scores in one pass.
+
+    scores is a students x activities NumPy matrix with the written, performance and
+    assessment activities side by side. Returns arrays of the component grades (students
+    x 3), the weighted scores (students x 3), the final grades rounded to 2 decimals like
+    the solver's, and the transmuted grades. Every grade is computed the way
+    calculate_component_grade and the solver compute it, one column at a time.
+    """
+    import numpy as np
+
+    counts = [len(w_perfect), len(p_perfect), len(a_perfect)]
+    bounds = np.cumsum([0] + counts)
+    perfect_totals = np.array([sum(w_perfect), sum(p_perfect), sum(a_perfect)], dtype=float)
+    weights = np.array([w_weight, p_weight, a_weight], dtype=float)
+    totals = np.stack([scores[:, bounds[c]:bounds[c + 1]].sum(axis=1) for c in range(3)], axis=1)
+    grades = np.where(perfect_totals > 0, totals / np.where(perfect_totals > 0, perfect_totals, 1) * 100, 0.0)
+    # Same order of operations as the solver, so a generated sheet grades back to its own finals
+    final = np.round((grades[:, 0] * w_weight + grades[:, 1] * p_weight + grades[:, 2] * a_weight) / 100, 2)
+    return {
+        "grades": grades,
+        "weighted": grades * weights / 100,
+        "final": final,
+        "transmuted": transmute_many(final),
+    }
+
+def _recorded_results(record, graded):
+    """Result dicts for the sheet writer, one per student of a graded record"""
+    w, p, _ = record["counts"]
+    for i, (name, row) in enumerate(zip(record["names"], record["scores"].tolist())):
+        if i in record["errors"]:
+            yield {"Student": name, "Final Grade": 0.0, "Error": record["errors"][i]}
+            continue
+        row = [int(v) if v.is_integer() else v for v in row]
+        grades = graded["grades"][i].tolist()
+        yield {
+            "Student": name,
+            "Written Works": (row[:w], grades[0]),
+            "Performance Task": (row[w:w + p], grades[1]),
+            "Quarterly Assessment": (row[w + p:], grades[2]),
+            "Final Grade": float(graded["final"][i]),
+        }
+
+def grade_class_record(path, output):
+    """Compute the grades of every sheet of a class record and write the completed workbook.
+
+    Sheets keep their titles; students whose scores can't be read are written as ERROR
+    rows, so write to a new file rather than over the record. Returns one summary dict
+    per sheet (title, students, errors as {row number: message}).
+    """
+    records = read_class_record(path)
+    if not records:
+        raise ValueError("The workbook has no sheet in the grade sheet layout.")
+    sheets, summaries = [], []
+    for record in records:
+        graded = grade_scores(record["scores"], *(record[key] for key in GRADE_KEYS))
+        sheets.append(dict(
+            {key: record[key] for key in GRADE_KEYS}, title=record["title"], subject=record["title"],
+            results=list(_recorded_results(record, graded)),
+        ))
+        summaries.append({
+            "title": record["title"],
+            "students": len(record["names"]),
+            "errors": {record["row_numbers"][i]: message for i, message in sorted(record["errors"].items())},
+        })
+    write_excel_workbook(output, sheets)
+    return summaries
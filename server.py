@@ -0,0 +1,439 @@
+"""Local grading service: the solver and the Excel exporter over HTTP, for a whole office.
+
+    python server.py --port 8765 --workers 4
+
+Requests carry a job in the same format cli.py reads (one sheet, or a "sheets" list),
+with the targets listed inline; roster files are not accepted:
+
+    POST /solve    NDJSON, one line per batch of students as soon as they are solved,
+                   then a last line with the per-sheet latency, queue and batch figures
+    POST /export   the finished .xlsx workbook, with the same figures in X-* headers
+    GET  /stats    queue depth, requests in flight, batches and latency percentiles
+    GET  /health
+
+Sheets that arrive within --batch-ms of each other and share a grading configuration
+(perfect scores, weights and solver settings) are solved together as one class on a
+single pool of worker processes shared by every request. Sheets with a class_budget_ms,
+a seed or distinct set are solved on their own: each keeps its whole budget and gets the
+same rows whatever else is queued. Nothing outside the standard
+library is needed besides what the solver and exporter already use, so it can be tried
+on localhost with curl:
+
+    curl -N --data-binary @job.json http://127.0.0.1:8765/solve
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cli import JobError, SOLVER_KEYS, sheets_from_job
+from grading import GRADE_KEYS, solve_class_parallel, solver_summary, write_excel_workbook, ResultStore
+
+MAX_BODY_BYTES = 8 * 2 ** 20
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class Job:
+    """One sheet of one request, from the moment it is queued until its last result is in"""
+
+    def __init__(self, sheet, queue_depth):
+        self.sheet = sheet
+        self.results = [None] * len(sheet["targets"])
+        self.error = None
+        self.changed = threading.Condition()
+        self.queue_depth = queue_depth  # sheets already waiting when this one was queued
+        self.queued = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.batch_sheets = 0
+        self.batch_students = 0
+
+    def deliver(self, positions, results):
+        with self.changed:
+            for position, result in zip(positions, results):
+                self.results[position] = result
+            self.changed.notify_all()
+
+    def finish(self, error=None):
+        with self.changed:
+            self.error = error
+            self.finished = time.perf_counter()
+            self.changed.notify_all()
+
+    def stream(self):
+        """Yield lists of (position, result) in roster order as they come in
+
+        Raises RuntimeError when the batch failed.
+        """
+        sent = 0
+        while sent < len(self.results):
+            with self.changed:
+                while self.results[sent] is None and self.finished is None:
+                    self.changed.wait()
+                if self.error is not None:
+                    raise RuntimeError(self.error)
+                if self.results[sent] is None:
+                    raise RuntimeError("The batch ended without solving every student.")
+                ready = []
+                while sent < len(self.results) and self.results[sent] is not None:
+                    ready.append((sent, self.results[sent]))
+                    sent += 1
+            yield ready
+
+    def wait(self):
+        with self.changed:
+            while self.finished is None:
+                self.changed.wait()
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return self.results
+
+    def timings(self):
+        """How long the sheet waited and solved, and what it was batched with"""
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_ms": (self.started - self.queued) * 1000,
+            "solve_ms": (self.finished - self.started) * 1000,
+            "latency_ms": (self.finished - self.queued) * 1000,
+            "batch_sheets": self.batch_sheets,
+            "batch_students": self.batch_students,
+        }
+
+
+class Batcher:
+    """Groups queued sheets by grading configuration and solves each group as one class"""
+
+    def __init__(self, workers, batch_ms, batch_threads=4):
+        self.workers = workers
+        self.batch_seconds = batch_ms / 1000
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(max_workers=workers)
+            # Start the workers now, before the server binds its socket, so they don't
+            # inherit it and the first request doesn't pay for starting them
+            self.pool.submit(int).result()
+        else:
+            self.pool = None
+        # Different configurations are solved side by side, all feeding the same process pool
+        self.runners = ThreadPoolExecutor(max_workers=batch_threads, thread_name_prefix="batch")
+        self.lock = threading.Condition()
+        self.pending = {}
+        self.in_flight = 0
+        self.batches = 0
+        self.requests = 0
+        self.latencies = deque(maxlen=1000)
+        self.closed = False
+        self.dispatcher = threading.Thread(target=self.dispatch, name="dispatcher", daemon=True)
+        self.dispatcher.start()
+
+    @staticmethod
+    def config_key(sheet):
+        """Sheets with equal keys can share one solve; None for a sheet that is solved on its own"""
+        if sheet.get("class_budget_ms"):
+            # The budget is the sheet's own; shared by a batch, every sheet would get a fraction of it
+            return None
+        if sheet.get("seed") is not None or sheet.get("distinct"):
+            # Batched, a seeded sheet's rows would depend on whatever else was queued, and
+            # distinct rows would be shared out over other people's sheets
+            return None
+        return json.dumps({key: sheet[key] for key in GRADE_KEYS + SOLVER_KEYS if key in sheet}, sort_keys=True)
+
+    def queue_depth(self):
+        return sum(len(jobs) for jobs in self.pending.values())
+
+    def submit(self, sheet):
+        with self.lock:
+            job = Job(sheet, self.queue_depth())
+            key = self.config_key(sheet)
+            self.pending.setdefault(job if key is None else key, []).append(job)
+            self.lock.notify()
+        return job
+
+    def dispatch(self):
+        while True:
+            with self.lock:
+                while not self.pending and not self.closed:
+                    self.lock.wait()
+                if self.closed:
+                    return
+            # Give sheets with the same configuration a moment to join the batch
+            time.sleep(self.batch_seconds)
+            with self.lock:
+                groups, self.pending = list(self.pending.values()), {}
+                self.in_flight += sum(len(jobs) for jobs in groups)
+            for jobs in groups:
+                self.runners.submit(self.solve, jobs)
+
+    def solve(self, jobs):
+        """Solve the sheets of one batch as a single class, handing results back as they come
+
+        If the batch as a whole fails, the students it didn't get to are solved again one
+        sheet at a time, so a sheet that can't be solved only fails itself.
+        """
+        started = time.perf_counter()
+        for job in jobs:
+            job.started = started
+            job.batch_sheets = len(jobs)
+            job.batch_students = sum(len(other.results) for other in jobs)
+
+        errors = {}
+        try:
+            self.solve_together(jobs)
+        except Exception as e:
+            errors = {job: f"{type(e).__name__}: {e}" for job in jobs}
+            if len(jobs) > 1:
+                for job in jobs:
+                    try:
+                        self.solve_together([job])
+                    except Exception as job_error:
+                        errors[job] = f"{type(job_error).__name__}: {job_error}"
+                    else:
+                        del errors[job]
+        for job in jobs:
+            job.finish(errors.get(job))
+        with self.lock:
+            self.in_flight -= len(jobs)
+            self.batches += 1
+
+    def solve_together(self, jobs):
+        """Solve every student of jobs that has no result yet as one class"""
+        targets, owners = [], []
+        for job in jobs:
+            for position, result in enumerate(job.results):
+                if result is None:
+                    targets.append(job.sheet["targets"][position])
+                    owners.append((job, position))
+        if not targets:
+            return
+
+        def on_chunk(positions, results):
+            by_job = {}
+            for position, result in zip(positions, results):
+                job, own_position = owners[position]
+                own = by_job.setdefault(job, ([], []))
+                own[0].append(own_position)
+                own[1].append(result)
+            for job, (own_positions, own_results) in by_job.items():
+                job.deliver(own_positions, own_results)
+
+        solve_class_parallel(targets, jobs[0].sheet, self.workers, pool=self.pool, on_chunk=on_chunk)
+
+    def record(self, seconds):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(seconds * 1000)
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                "requests": self.requests,
+                "queue_depth": self.queue_depth(),
+                "in_flight": self.in_flight,
+                "batches": self.batches,
+                "workers": self.workers,
+            }
+        if latencies:
+            stats["latency_ms"] = {
+                "mean": sum(latencies) / len(latencies),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max": latencies[-1],
+            }
+        return stats
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify()
+        self.runners.shutdown(wait=False)
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class GradingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, batcher, quiet=False):
+        super().__init__(address, GradingHandler)
+        self.batcher = batcher
+        self.quiet = quiet
+
+
+class GradingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "GradeService/1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def write_chunk(self, data):
+        """One piece of a chunked (Transfer-Encoding: chunked) response; empty data ends it"""
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self.send_json(200, self.server.batcher.stats())
+        else:
+            self.send_json(404, {"error": f"No such endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path not in ("/solve", "/export"):
+            self.send_json(404, {"error": f"No such endpoint: {self.path}"})
+            return
+        started = time.perf_counter()
+        try:
+            sheets = self.read_job()
+        except JobError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            # Anything else read_job trips over is still the job's fault, not the server's
+            self.send_json(400, {"error": f"Invalid job: {type(e).__name__}: {e}"})
+            return
+
+        jobs = [self.server.batcher.submit(sheet) for sheet in sheets]
+        try:
+            if self.path == "/solve":
+                self.stream_results(jobs)
+            else:
+                self.send_workbook(jobs)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; its sheets still finish solving for the rest of the batch
+            self.close_connection = True
+        elapsed = time.perf_counter() - started
+        self.server.batcher.record(elapsed)
+        self.log_message(
+            '"%s" %d sheet(s), %d student(s), %.1f ms, queue depth %d', self.requestline, len(jobs),
+            sum(len(job.results) for job in jobs), elapsed * 1000, jobs[0].queue_depth
+        )
+
+    def read_job(self):
+        """The request body parsed into sheets; raises JobError for anything unusable"""
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            raise JobError("A Content-Length header is required.")
+        if not 0 < length <= MAX_BODY_BYTES:
+            raise JobError(f"The job must be between 1 and {MAX_BODY_BYTES} bytes.")
+        try:
+            job = json.loads(self.rfile.read(length).decode("utf-8"))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise JobError(f"The job is not valid JSON: {e}")
+        return sheets_from_job(job)
+
+    def stream_results(self, jobs):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Queue-Depth", str(jobs[0].queue_depth))
+        self.end_headers()
+
+        done = {"done": True, "sheets": []}
+        for number, job in enumerate(jobs):
+            names = job.sheet["names"] or []
+            try:
+                for ready in job.stream():
+                    lines = []
+                    for position, result in ready:
+                        line = {"sheet": number, "index": position, "result": result}
+                        if position < len(names) and names[position]:
+                            line["student"] = names[position]
+                        lines.append(json.dumps(line) + "\n")
+                    self.write_chunk("".join(lines).encode("utf-8"))
+                job.wait()
+            except RuntimeError as e:
+                done["sheets"].append({"error": str(e)})
+                continue
+            done["sheets"].append({**job.timings(), "summary": solver_summary(job.results)})
+        self.write_chunk((json.dumps(done) + "\n").encode("utf-8"))
+        self.write_chunk(b"")
+
+    def send_workbook(self, jobs):
+        try:
+            for job in jobs:
+                job.wait()
+        except RuntimeError as e:
+            self.send_json(500, {"error": str(e)})
+            return
+        for job in jobs:
+            results = ResultStore.from_results(job.results, job.sheet)
+            if job.sheet["names"]:
+                results.set_names(job.sheet["names"])
+            job.sheet["results"] = results
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "grades.xlsx")
+            try:
+                write_excel_workbook(path, [job.sheet for job in jobs])
+            except ImportError:
+                self.send_json(501, {"error": "openpyxl is required to write workbooks."})
+                return
+            slowest = max(jobs, key=lambda job: job.finished)
+            timings = slowest.timings()
+            self.send_response(200)
+            self.send_header("Content-Type", XLSX_TYPE)
+            self.send_header("Content-Disposition", 'attachment; filename="grades.xlsx"')
+            self.send_header("Content-Length", str(os.path.getsize(path)))
+            self.send_header("X-Queue-Depth", str(jobs[0].queue_depth))
+            self.send_header("X-Queue-Ms", f"{timings['queue_ms']:.1f}")
+            self.send_header("X-Solve-Ms", f"{timings['solve_ms']:.1f}")
+            self.send_header("X-Batch-Sheets", str(timings["batch_sheets"]))
+            self.end_headers()
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the grade solver and Excel exporter over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes shared by all requests (default: one per CPU)")
+    parser.add_argument("--batch-ms", type=float, default=25.0,
+                        help="how long a sheet waits for others with the same configuration (default 25)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="don't log every request")
+    args = parser.parse_args(argv)
+
+    batcher = Batcher(args.workers, args.batch_ms)
+    try:
+        server = GradingServer((args.host, args.port), batcher, args.quiet)
+    except OSError as e:
+        batcher.close()
+        print(f"error: can't listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+    print(f"Serving on http://{args.host}:{args.port}/ with {args.workers} worker process(es)")
+    # Stop on SIGTERM the same way as on Ctrl+C, so the worker processes are shut down too
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())